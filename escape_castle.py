@@ -15,14 +15,25 @@ Setup:
 
 from __future__ import annotations
 
+import atexit
+import copy
+import functools
 import json
 import re
 import sys
+import threading
 import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+
+try:  # valfritt: snabbare JSON-parsning om orjson finns installerat
+    import orjson
+except ImportError:
+    orjson = None
 
 # -----------------------------
 # Configuration
@@ -32,46 +43,143 @@ import requests
 import os
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_CHAT_API = f"{OLLAMA_HOST}/api/chat"
+# Obs: Ollamas "llama3.1:8b"-tagg är redan Q4_K_M-kvantiserad; sätt t.ex.
+# MODEL_NAME=llama3.1:8b-instruct-q8_0 för högre kvalitet (långsammare decode).
 MODEL_NAME = os.getenv("MODEL_NAME", "llama3.1:8b")
+# (valfritt) mindre/snabbare modell som får försöka först varje tur, t.ex. "llama3.2:3b".
+# Vid ogiltig JSON eller safety_reason eskaleras turen till MODEL_NAME. Tomt = av.
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "")
 
 TEMPERATURE = 0.2
 TOP_P = 0.9
+# Antal tidigare turer (user + assistant-par) som skickas med varje tur. Tillståndet står
+# alltid i user-prompten, så historiken är bara för ton/kontinuitet; HISTORY_TURNS=0 stänger av den.
+try:
+    HISTORY_TURNS = max(0, int(os.getenv("HISTORY_TURNS", "3")))
+except ValueError:
+    HISTORY_TURNS = 3
+# Övre gräns för genererade tokens per svar (ett giltigt svar är ~100–250 tokens)
+NUM_PREDICT = 400
+# Kontextfönster. Systemprefixet (prompt + scenkort) är ~3k tokens, så Ollamas standard
+# (2048 i äldre versioner) skulle kapa prompten framifrån och förstöra prefixcachen.
+# Samma värde måste skickas i alla anrop, annars laddar Ollama om modellen.
+# Under ~4k får inte ens systemprefixet plats, så lägre värden höjs dit.
+try:
+    NUM_CTX = max(4096, int(os.getenv("NUM_CTX", "8192")))
+except ValueError:
+    NUM_CTX = 8192
+# Håll modellen laddad mellan turerna så Ollama kan återanvända prompt-prefixet
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Strukturerad output (JSON-schema i "format", Ollama >= 0.5). OLLAMA_JSON_SCHEMA=0 ger
+# gamla format="json" för äldre servrar.
+OLLAMA_JSON_SCHEMA = os.getenv("OLLAMA_JSON_SCHEMA", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+# Svarscache för identiska (system, user)-prompter. Av som standard eftersom TEMPERATURE > 0
+# ger varierande svar; slå på med LLM_REPLY_CACHE=1 (alltid på vid temperature 0).
+LLM_REPLY_CACHE = os.getenv("LLM_REPLY_CACHE", "0").strip().lower() in {"1", "true", "yes", "on"}
+LLM_REPLY_CACHE_SIZE = 512
 
 DEV_LOG_PATH = "game_dev.log"
+# DEV_LOG=0 stänger av dev-loggen (och serialiseringen av loggraderna)
+DEV_LOG_ENABLED = os.getenv("DEV_LOG", "1").strip().lower() not in {"0", "false", "no", "off"}
 NOTHING_LINE = "Nothing special happened."
 
 # -----------------------------
 # Utilities
 # -----------------------------
 
+def json_loads(text: Any) -> Any:
+    """json.loads via orjson when available (str or bytes)."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def json_dumps(obj: Any) -> str:
+    """json.dumps via orjson when available (orjson output is compact and not ASCII-escaped)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+_DEV_LOG_FH = None  # öppnas vid första raden och hålls öppen (buffrad)
+_DEV_LOG_TS: Tuple[int, str] = (-1, "")  # (sekund, formaterad tidsstämpel)
+# warm_up-trådar och Flasks trådade handlers loggar samtidigt
+_DEV_LOG_LOCK = threading.Lock()
+
+
 def dev_log(line: str) -> None:
-    ts = time.strftime("%Y-%m-%d %H:%M:%S")
-    with open(DEV_LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {line}\n")
+    global _DEV_LOG_FH, _DEV_LOG_TS
+    if not DEV_LOG_ENABLED:
+        return
+    with _DEV_LOG_LOCK:
+        if _DEV_LOG_FH is None:
+            _DEV_LOG_FH = open(DEV_LOG_PATH, "a", encoding="utf-8", buffering=8192)
+            atexit.register(_DEV_LOG_FH.close)
+        now = int(time.time())
+        if now != _DEV_LOG_TS[0]:
+            _DEV_LOG_TS = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+        _DEV_LOG_FH.write(f"[{_DEV_LOG_TS[1]}] {line}\n")
+
+
+def flush_dev_log() -> None:
+    """Write buffered dev-log lines to disk (once per turn is enough)."""
+    with _DEV_LOG_LOCK:
+        if _DEV_LOG_FH is not None:
+            _DEV_LOG_FH.flush()
+
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
 
 
 def strip_code_fences(s: str) -> str:
     s = s.strip()
-    fence = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL | re.IGNORECASE)
-    m = fence.match(s)
+    m = _FENCE_RE.match(s)
     if m:
         return m.group(1).strip()
     return s
 
 
+def _extract_json_span(text: str) -> Optional[str]:
+    """Första balanserade {...} i texten (en linjär genomläsning, strängmedveten)."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
 def parse_llm_json(text: str) -> Optional[Dict[str, Any]]:
     try:
-        return json.loads(text)
+        return json_loads(text)
     except Exception:
         text2 = strip_code_fences(text)
         try:
-            return json.loads(text2)
+            return json_loads(text2)
         except Exception:
-            m = re.search(r"\{.*\}", text, flags=re.DOTALL)
-            if m:
-                snippet = m.group(0)
+            snippet = _extract_json_span(text)
+            if snippet is not None:
                 try:
-                    return json.loads(snippet)
+                    return json_loads(snippet)
                 except Exception:
                     return None
     return None
@@ -81,7 +189,11 @@ def parse_llm_json(text: str) -> Optional[Dict[str, Any]]:
 # Data structures
 # -----------------------------
 
-@dataclass
+# __slots__ på dataklasser kräver Python 3.10+; äldre versioner kör utan
+_DATACLASS_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class GameState:
     current_room: str = "cell_01"
     hp: int = 100
@@ -130,9 +242,15 @@ class GameState:
         "in_moat": False                # du ligger i vallgraven
     })
 
+    # Bumpas vid varje item-ändring (_store_item); sync_flags_with_items minns senast synkade (version, rum)
+    _items_version: int = field(default=0, repr=False, compare=False)
+    _synced_key: Optional[Tuple[int, str]] = field(default=None, repr=False, compare=False)
+    _inventory_version: int = field(default=-1, repr=False, compare=False)
+    _items_json_cache: Optional[Tuple[int, str]] = field(default=None, repr=False, compare=False)
+
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class LLMResult:
     narration: str
     noise_level: int
@@ -346,6 +464,11 @@ SCENES: Dict[str, Dict[str, Any]] = {
 
 }
 
+# Scenkorten är konstanta, så serialisera dem en gång i stället för varje tur
+SCENE_CARDS_JSON: Dict[str, str] = {
+    rid: json.dumps(card, ensure_ascii=False, indent=2) for rid, card in SCENES.items()
+}
+
 # Static room graph (engine controls legal travel)
 ROOM_GRAPH: Dict[str, List[str]] = {
     "cell_01": ["coal_01"],
@@ -443,14 +566,44 @@ narration, noise_level, hp_delta, events, flags_set, progression, safety_reason
 """
 
 
-USER_INSTRUCTION_TEMPLATE = """CURRENT ROOM:
+# Påminnelser per rum (None = alla rum). Bara de som gäller aktuellt rum skickas,
+# så prompten inte bär regler för rum spelaren inte är i.
+_CELL_COAL = ("cell_01", "coal_01")
+ROOM_REMINDERS: List[Tuple[Optional[Tuple[str, ...]], str]] = [
+    (_CELL_COAL, "Traversal (MANDATORY): down from the cell => 'enter_coal_cellar'; up from the cellar => 'return_to_cell'."),
+    (("cell_01",), "Straw in the Prison Cell reveals the loose stone if not already."),
+    (("cell_01",), "To move the stone, the player must explicitly try to lift/pry/drag it ('stone_lifted')."),
+    (None, "Inventory: SINGLE slot; to pick another item, drop the current one ('drop_torch')."),
+    (("coal_01",), "Coal Cellar: default is pitch-black. Without lit torch, moving causes 'dark_stumble' and you remain in place. With light, describe staircase and door."),
+    (None, "Lighting the torch works ONLY in the Prison Cell using the wall torch while holding the stick."),
+    (("cell_01",), "IMPORTANT (cell_01 only): If noise_level >= 2 THIS TURN, include 'guard_punishes', set hp_delta to -20, and DO NOT narrate the guard as oblivious/unresponsive."),
+    (("coal_01",), "IMPORTANT (coal_01): Do NOT narrate using a torch unless it's in inventory or a lit torch is present here. Do NOT describe a \"dimly lit\" cellar unless 'torch_lit' is true."),
+    (("cell_01",), "Do NOT add 'straw_rummaged' or narrate interacting with straw unless the player explicitly wrote straw/hay/bed."),
+    (None, "Do NOT narrate lighting a torch outside cell_01; if attempted, refuse and end with \"Nothing special happened.\""),
+    (("hall_01",), "Great Hall: well-lit. You may 'return_to_coal'. Keys can be picked up only with free hands (single-slot). \n"
+                   "  The courtyard door is locked until 'unlock_courtyard_door' with keys."),
+    (("cell_01",), "Non-movement interactions with the hole (throw/poop/etc.) MUST NOT cause traversal; give a playful denial + \"Nothing special happened.\""),
+    (None, "Flavorful denials are preferred over plain refusals for impossible/silly actions; keep them short and end with \"Nothing special happened.\""),
+    (None, "Self-harm attempts must be refused diegetically; do not inflict damage."),
+    (("courtyard_01",), "In the courtyard, the gate can’t be opened from the ground; only the tower lever lowers it."),
+    (("hall_01",), "After the knight is unconscious, do not create new combat; mention he’s out cold if addressed."),
+]
+
+# Rumsdelen är statisk per rum och läggs sist i systemmeddelandet, så att hela
+# prefixet (system + scenkort) är byte-identiskt mellan turer i samma rum.
+ROOM_CONTEXT_TEMPLATE = """CURRENT ROOM:
 - Id: {room_id}
 - Title: {room_title}
 
 SCENE CARD:
 {scene_card_json}
 
-CURRENT STATE:
+REMINDERS:
+{reminders}
+"""
+
+
+USER_INSTRUCTION_TEMPLATE = """CURRENT STATE:
 - HP: {hp}
 - Flags (cell): {flags_cell}
 - Flags (coal): {flags_coal}
@@ -461,26 +614,6 @@ CURRENT STATE:
 - Inventory (one slot): {inventory}
 
 
-REMINDERS:
-- Traversal (MANDATORY): down from the cell => 'enter_coal_cellar'; up from the cellar => 'return_to_cell'.
-- Straw in the Prison Cell reveals the loose stone if not already.
-- To move the stone, the player must explicitly try to lift/pry/drag it ('stone_lifted').
-- Inventory: SINGLE slot; to pick another item, drop the current one ('drop_torch').
-- Coal Cellar: default is pitch-black. Without lit torch, moving causes 'dark_stumble' and you remain in place. With light, describe staircase and door.
-- Lighting the torch works ONLY in the Prison Cell using the wall torch while holding the stick.
-- IMPORTANT (cell_01 only): If noise_level >= 2 THIS TURN, include 'guard_punishes', set hp_delta to -20, and DO NOT narrate the guard as oblivious/unresponsive.
-- IMPORTANT (coal_01): Do NOT narrate using a torch unless it's in inventory or a lit torch is present here. Do NOT describe a "dimly lit" cellar unless 'torch_lit' is true.
-- Do NOT add 'straw_rummaged' or narrate interacting with straw unless the player explicitly wrote straw/hay/bed.
-- Do NOT narrate lighting a torch outside cell_01; if attempted, refuse and end with "Nothing special happened."
-- Great Hall: well-lit. You may 'return_to_coal'. Keys can be picked up only with free hands (single-slot). 
-  The courtyard door is locked until 'unlock_courtyard_door' with keys.
-- Non-movement interactions with the hole (throw/poop/etc.) MUST NOT cause traversal; give a playful denial + "Nothing special happened."
-- Flavorful denials are preferred over plain refusals for impossible/silly actions; keep them short and end with "Nothing special happened."
-- Self-harm attempts must be refused diegetically; do not inflict damage.
-- In the courtyard, the gate can’t be opened from the ground; only the tower lever lowers it.
-- After the knight is unconscious, do not create new combat; mention he’s out cold if addressed.
-
-
 PLAYER ACTION:
 {player_action}
 
@@ -490,49 +623,206 @@ IMPORTANT:
 """
 
 
+@functools.lru_cache(maxsize=64)
+def _dumps_flags(frozen: Tuple[Tuple[str, Any], ...]) -> str:
+    """JSON for a flat flag dict, given as tuple(d.items()) so key order is kept."""
+    return json.dumps(dict(frozen), ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=None)
+def build_system_prompt(room_id: str) -> str:
+    """SYSTEM_PROMPT followed by the room's static context (scene card + reminders)."""
+    return SYSTEM_PROMPT + "\n" + ROOM_CONTEXT_TEMPLATE.format(
+        room_id=room_id,
+        room_title=SCENES[room_id].get("title", room_id),
+        scene_card_json=SCENE_CARDS_JSON[room_id],
+        reminders="\n".join(f"- {text}" for rooms, text in ROOM_REMINDERS if rooms is None or room_id in rooms),
+    )
+
+
+def _items_json(state: GameState) -> str:
+    """JSON for state.items, re-serialized only when the items version has changed."""
+    cached = state._items_json_cache
+    if cached is None or cached[0] != state._items_version:
+        cached = (state._items_version, json.dumps(state.items, ensure_ascii=False))
+        state._items_json_cache = cached
+    return cached[1]
+
+
+def build_user_prompt(state: GameState, player_action: str) -> str:
+    """Fill USER_INSTRUCTION_TEMPLATE with the current (per-turn) state."""
+    return USER_INSTRUCTION_TEMPLATE.format(
+        hp=state.hp,
+        flags_cell=_dumps_flags(tuple(state.flags_cell.items())),
+        flags_coal=_dumps_flags(tuple(state.flags_coal.items())),
+        flags_hall=_dumps_flags(tuple(state.flags_hall.items())),
+        flags_courtyard=_dumps_flags(tuple(state.flags_courtyard.items())),
+        items=_items_json(state),
+        inventory=json.dumps(state.inventory, ensure_ascii=False),
+        player_action=player_action
+    )
+
+
 # -----------------------------
 # LLM client (Ollama)
 # -----------------------------
 
+# Streamade chunks vi läser efter att JSON-objektet stängts innan vi ger upp på "done"
+_STREAM_TAIL_CHUNKS = 8
+
+
 class OllamaChat:
-    def __init__(self, model: str = MODEL_NAME, temperature: float = TEMPERATURE, top_p: float = TOP_P):
+    def __init__(self, model: str = MODEL_NAME, temperature: float = TEMPERATURE, top_p: float = TOP_P,
+                 fast_model: str = FAST_MODEL_NAME):
         self.model = model
+        self.fast_model = fast_model or None
         self.temperature = temperature
         self.top_p = top_p
-        self.history: List[Dict[str, str]] = []
+        # Bara de senaste HISTORY_TURNS paren skickas, så äldre behöver inte sparas
+        self.history: Deque[Dict[str, str]] = deque(maxlen=2 * HISTORY_TURNS)
+        # En Session per klient: återanvänd TCP-anslutningen till Ollama mellan turer
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        self.session.headers["Connection"] = "keep-alive"
+        # (system_prompt, user_prompt) -> (history text, parsed reply); LRU
+        self.reply_cache: Optional[OrderedDict[Tuple[str, str], Tuple[str, Dict[str, Any]]]] = (
+            OrderedDict() if (LLM_REPLY_CACHE or temperature == 0) else None
+        )
 
     def reset(self):
-        self.history = []
+        self.history.clear()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def warm_up(self, system_prompt: Optional[str] = None) -> None:
+        """
+        Ask Ollama to load the model(s) now, so the next turn skips the cold start.
+        With a system_prompt, also prefill it (1 token generated) so the server's prompt
+        cache already holds that prefix when the player's turn arrives.
+        """
+        # Snabbmodellen först (den svarar först), sedan huvudmodellen som turen kan eskalera till
+        models = [self.fast_model, self.model] if self.fast_model else [self.model]
+        for model in models:
+            payload: Dict[str, Any] = {
+                "model": model, "messages": [], "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": {"num_ctx": NUM_CTX},
+            }
+            if system_prompt:
+                payload["messages"] = [{"role": "system", "content": system_prompt}]
+                payload["stream"] = False
+                payload["options"]["num_predict"] = 1
+            try:
+                requests.post(OLLAMA_CHAT_API, json=payload, timeout=300).close()
+            except requests.exceptions.RequestException as e:
+                dev_log(f"LLM_WARMUP_FAILED ({model}): {e}")
+
+    def _post_chat(self, payload: Dict[str, Any], bad_body_msg: str) -> str:
+        """
+        POST a streamed chat request and return the assembled message content.
+        Stops reading shortly after the top-level JSON object closes, so trailing
+        whitespace that JSON mode sometimes keeps emitting is not waited for.
+        """
+        parts: List[str] = []
+        depth = 0
+        in_str = escaped = closed = False
+        chunks_after_close = 0
+        with self.session.post(OLLAMA_CHAT_API, json=payload, timeout=120, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json_loads(line)
+                except ValueError:
+                    raise ValueError(bad_body_msg)
+                # Fel efter att 200-headern skickats kommer som en egen rad i strömmen
+                if chunk.get("error"):
+                    raise requests.exceptions.HTTPError(f"Ollama error: {chunk['error']}", response=resp)
+                if chunk.get("done"):
+                    parts.append(chunk.get("message", {}).get("content", ""))
+                    break
+                if closed:
+                    # Ge servern några chunks att skicka "done" så anslutningen kan återanvändas;
+                    # kommer det inte släpper vi svaret och anslutningen stängs i stället
+                    chunks_after_close += 1
+                    if chunks_after_close > _STREAM_TAIL_CHUNKS:
+                        break
+                    continue
+                delta = chunk.get("message", {}).get("content", "")
+                parts.append(delta)
+                for ch in delta:
+                    if in_str:
+                        if escaped:
+                            escaped = False
+                        elif ch == "\\":
+                            escaped = True
+                        elif ch == '"':
+                            in_str = False
+                    elif ch == '"':
+                        in_str = True
+                    elif ch == "{":
+                        depth += 1
+                    elif ch == "}" and depth > 0:
+                        depth -= 1
+                        if depth == 0:
+                            closed = True
+                            break
+        return "".join(parts)
+
+    @staticmethod
+    def _parse_reply(content: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(parsed reply or None, text to keep in history or None to re-dump the parsed reply)."""
+        # Ren JSON (vanligt med format=json): spara modellens egen text i historiken,
+        # så slipper vi dumps-rundan och prefixet matchar det modellen faktiskt genererade
+        try:
+            return json_loads(content), content
+        except ValueError:
+            return parse_llm_json(content), None
 
     def chat_json(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        cache_key = (system_prompt, user_prompt)
+        if self.reply_cache is not None and cache_key in self.reply_cache:
+            self.reply_cache.move_to_end(cache_key)
+            history_text, cached = self.reply_cache[cache_key]
+            dev_log("LLM_REPLY_CACHE_HIT")
+            self.history.append({"role": "user", "content": user_prompt})
+            self.history.append({"role": "assistant", "content": history_text})
+            return copy.deepcopy(cached)
+
         messages = []
         messages.append({"role": "system", "content": system_prompt})
-        tail_history = self.history[-6:]
-        messages.extend(tail_history)
+        messages.extend(self.history)
         messages.append({"role": "user", "content": user_prompt})
 
         payload = {
-            "model": self.model,
-            "format": "json",
-            "stream": False,
+            "model": self.fast_model or self.model,
+            "format": LLM_RESULT_SCHEMA if OLLAMA_JSON_SCHEMA else "json",
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
             "options": {
                 "temperature": self.temperature,
-                "top_p": self.top_p
+                "top_p": self.top_p,
+                "num_predict": NUM_PREDICT,
+                "num_ctx": NUM_CTX
             },
             "messages": messages
         }
 
-        resp = requests.post(OLLAMA_CHAT_API, json=payload, timeout=120)
-        resp.raise_for_status()
-        try:
-            data = resp.json()
-        except ValueError:
-            raise ValueError("Model response was not valid JSON (HTTP OK but non-JSON body).")
-
-        content = data.get("message", {}).get("content", "")
+        content = self._post_chat(payload, "Model response was not valid JSON (HTTP OK but non-JSON body).")
         dev_log(f"RAW_MODEL_OUTPUT: {content}")
 
-        parsed = parse_llm_json(content)
+        parsed, history_content = self._parse_reply(content)
+
+        # Snabbmodellen klarade inte turen: ta om samma fråga med huvudmodellen
+        if self.fast_model and (parsed is None or (isinstance(parsed, dict)
+                                                   and str(parsed.get("safety_reason") or "").strip())):
+            dev_log(f"FAST_MODEL_ESCALATE: {self.fast_model} -> {self.model}")
+            payload["model"] = self.model
+            content = self._post_chat(payload, "Model response was not valid JSON (HTTP OK but non-JSON body).")
+            dev_log(f"RAW_MODEL_OUTPUT_ESCALATED: {content}")
+            parsed, history_content = self._parse_reply(content)
+
         if parsed is None:
             dev_log("JSON parse failed; attempting one strict re-ask.")
             strict_user = user_prompt + "\n\nYour last output was invalid JSON. Respond again with VALID JSON ONLY."
@@ -540,20 +830,23 @@ class OllamaChat:
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": strict_user},
             ]
-            resp2 = requests.post(OLLAMA_CHAT_API, json=payload, timeout=120)
-            resp2.raise_for_status()
-            try:
-                data2 = resp2.json()
-            except ValueError:
-                raise ValueError("Retry response was not valid JSON.")
-            content2 = data2.get("message", {}).get("content", "")
+            content2 = self._post_chat(payload, "Retry response was not valid JSON.")
             dev_log(f"RAW_MODEL_OUTPUT_RETRY: {content2}")
             parsed = parse_llm_json(content2)
+            history_content = None
             if parsed is None:
                 raise ValueError("Model failed to return valid JSON twice.")
 
+        history_text = history_content or json_dumps(parsed)
         self.history.append({"role": "user", "content": user_prompt})
-        self.history.append({"role": "assistant", "content": json.dumps(parsed)})
+        self.history.append({"role": "assistant", "content": history_text})
+
+        # Säkerhetsvägrade svar cachas inte; de ska alltid bedömas på nytt
+        if (self.reply_cache is not None and isinstance(parsed, dict)
+                and not str(parsed.get("safety_reason") or "").strip()):
+            self.reply_cache[cache_key] = (history_text, copy.deepcopy(parsed))
+            if len(self.reply_cache) > LLM_REPLY_CACHE_SIZE:
+                self.reply_cache.popitem(last=False)
 
         return parsed
 
@@ -561,12 +854,18 @@ class OllamaChat:
 # -----------------------------
 # Engine: validation & progression
 # -----------------------------
-ALLOWED_HALL_FLAGS = {"knight_knocked_out", "courtyard_door_unlocked"}
-ALLOWED_CELL_FLAGS = {"found_loose_stone", "stone_moved", "entered_hole", "has_torch_stick", "torch_lit"}
-ALLOWED_COAL_FLAGS = {"has_torch_stick", "torch_lit"}
-ALLOWED_COURTYARD_FLAGS = {"at_tower_top", "gate_lowered", "guards_present"}
+ALLOWED_HALL_FLAGS = frozenset({"knight_knocked_out", "courtyard_door_unlocked"})
+ALLOWED_CELL_FLAGS = frozenset({"found_loose_stone", "stone_moved", "entered_hole", "has_torch_stick", "torch_lit"})
+ALLOWED_COAL_FLAGS = frozenset({"has_torch_stick", "torch_lit"})
+ALLOWED_COURTYARD_FLAGS = frozenset({"at_tower_top", "gate_lowered", "guards_present"})
+_ALLOWED_FLAGS_BY_ROOM: Dict[str, FrozenSet[str]] = {
+    "cell_01": ALLOWED_CELL_FLAGS,
+    "coal_01": ALLOWED_COAL_FLAGS,
+    "hall_01": ALLOWED_HALL_FLAGS,
+    "courtyard_01": ALLOWED_COURTYARD_FLAGS,
+}
 
-ALLOWED_EVENTS = {
+ALLOWED_EVENTS = frozenset({
     "straw_rummaged", "stone_lifted",
     "enter_coal_cellar", "return_to_cell",
     "dark_stumble",
@@ -591,8 +890,80 @@ ALLOWED_EVENTS = {
     "jump_into_moat", "swim_across",
     "throw_keys", "throw_crossbow",
 
+})
+
+# Schemat för modellens svar (samma nycklar som LLMResult); skickas som Ollamas "format".
+# events begränsas till ALLOWED_EVENTS redan vid avkodningen.
+LLM_RESULT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "narration": {"type": "string"},
+        "noise_level": {"type": "integer", "minimum": 0, "maximum": 3},
+        "hp_delta": {"type": "integer"},
+        "events": {"type": "array", "items": {"type": "string", "enum": sorted(ALLOWED_EVENTS)}},
+        "flags_set": {"type": "array", "items": {"type": "string"}},
+        "progression": {"type": "string"},
+        "safety_reason": {"type": "string"},
+    },
+    "required": ["narration", "noise_level", "hp_delta", "events", "flags_set", "progression", "safety_reason"],
+}
+
+# Flags derived from events at the end of a turn (cell vs. all other rooms)
+_EVENT_TO_FLAG_CELL = {
+    "stone_lifted": "stone_moved",
+    "stone_moved": "stone_moved",
+    "straw_rummaged": "found_loose_stone",
+    "enter_coal_cellar": "entered_hole",
+    "light_torch": "torch_lit",
+}
+_EVENT_TO_FLAG_OTHER = {
+    "pickup_stick": "has_torch_stick",
+    "pickup_torch": "has_torch_stick",
+    "light_torch": "torch_lit",
+    "pull_lever": "gate_lowered",  # Courtyard convenience
 }
 
+# Deterministic narration for engine-committed room transitions
+_CANONICAL_MOVE_LINES: Dict[Tuple[str, str], str] = {
+    ("cell_01", "coal_01"): "You carefully crawl into the hole and drop into the coal cellar.",
+    ("coal_01", "cell_01"): "You climb back up through the crawl opening into the prison cell.",
+    ("coal_01", "hall_01"): "You push the far door open and step into the great hall.",
+    ("hall_01", "coal_01"): "You slip back through the door into the coal cellar.",
+    ("hall_01", "courtyard_01"): "You pull the door open and step into the castle courtyard.",
+}
+
+# Events that count as "something happened" (otherwise the turn ends with NOTHING_LINE)
+_MEANINGFUL_EVENTS = frozenset({
+    "drop_torch", "pickup_torch", "pickup_stick", "light_torch", "extinguish_torch",
+    "drop_keys", "pickup_keys", "unlock_courtyard_door",
+    "drop_crossbow", "pickup_crossbow", "shoot_guard",
+    "dark_stumble", "guard_punishes",
+    "enter_coal_cellar", "return_to_cell", "return_to_coal", "open_hall_door",
+    "straw_rummaged", "stone_lifted",
+    "knight_notice", "combat_knock_guard",
+    "climb_ladder_up", "climb_ladder_down", "pull_lever", "guards_arrive",
+    "cross_gate_bridge", "jump_into_moat", "swim_across",
+    "throw_keys", "throw_crossbow",
+})
+
+# Knight combat events (scrubbed when the knight can't react)
+_KNIGHT_COMBAT_EVENTS = frozenset({"knight_notice", "combat_knock_guard"})
+
+# Outcomes that keep their narration when knight text is scrubbed in cell_01/coal_01
+_KNIGHT_SCRUB_OTHER_EVENTS = frozenset({
+    "straw_rummaged", "stone_lifted", "enter_coal_cellar", "return_to_cell", "open_hall_door",
+    "pickup_stick", "pickup_torch", "drop_torch", "extinguish_torch", "light_torch",
+    "drop_keys", "pickup_keys",
+    "dark_stumble",
+})
+
+# Cellens flaggkedja i ordning: (flagga, förutsättning). Varje steg kräver det föregående.
+_CELL_FLAG_CHAIN: Tuple[Tuple[str, Optional[str]], ...] = (
+    ("found_loose_stone", None),
+    ("stone_moved", "found_loose_stone"),
+    ("entered_hole", "stone_moved"),
+)
+
 
 # Robust hit-verb detection to avoid duplicate guard line
 HIT_VERBS_RE = re.compile(
@@ -601,6 +972,8 @@ HIT_VERBS_RE = re.compile(
     r"kick|kicks|kicked|club|clubs|clubbed)\b",
     re.IGNORECASE
 )
+# Substrings that every HIT_VERBS_RE match contains (lowercase prefilter)
+_HIT_VERB_HINTS = ("strik", "struck", "hit", "smack", "punch", "kick", "club")
 
 # ---------- Intent inference (from player's input) ----------
 
@@ -647,8 +1020,6 @@ _STONE_ACT_RE2 = re.compile(
 _CROSS_GATE_RE = re.compile(r"\b(cross|run|dash|go|head)\b.*\b(gate|bridge|drawbridge)\b", re.IGNORECASE)
 
 _SHOOT_RE = re.compile(r"\b(shoot|fire|loose|let\s+fly|squeeze(?:\s+the)?\s+trigger|aim\s+and\s+fire)\b", re.IGNORECASE)
-_ALL_THREE_RE = re.compile(r"\b(all\s+three|all\s+3|three|3|shoot\s+them\s+all|shoot\s+all)\b", re.IGNORECASE)
-_TWO_RE = re.compile(r"\b(two|2|both)\b", re.IGNORECASE)
 _LADDER_UP_RE = re.compile(r"\b(climb|go|head|get)\b.*\b(?:up\s+(?:the\s+)?(?:ladder|tower)|ladder\s+up|up\s+the\s+ladder)\b", re.IGNORECASE)
 _LADDER_DOWN_RE = re.compile(r"\b(climb|go|head|get)\b.*\b(?:down\s+(?:the\s+)?ladder|ladder\s+down|down\s+the\s+ladder)\b", re.IGNORECASE)
 
@@ -686,6 +1057,172 @@ _OTHER_SIDE_SWIM_RE = re.compile(
     re.IGNORECASE
 )
 
+# Word-level checks (no regex backtracking): verb → preposition → target, in order
+_WORD_RE = re.compile(r"\w+")
+_PASS_VERBS = frozenset({"walk", "go", "step", "move", "slip"})
+_PASS_PREPS = frozenset({"through", "into", "out"})
+_PASS_TARGETS = frozenset({"courtyard", "door"})
+
+
+def _words_in_order(words: List[str], *groups: frozenset) -> bool:
+    """True if a word from each group occurs, with the groups appearing in the given order."""
+    it = iter(words)
+    return all(any(w in group for w in it) for group in groups)
+
+
+_SENTENCE_END = (".", "!", "?")
+
+
+def _append_sentence(narr: str, sent: str) -> str:
+    """Append a sentence, adding a full stop to narr first if it lacks a terminator."""
+    if not narr:
+        return sent
+    if not narr.endswith(_SENTENCE_END):
+        narr += "."
+    return narr + " " + sent
+
+
+def _nothing(msg: str) -> str:
+    """Denial line ending with the canonical NOTHING_LINE."""
+    return msg + " " + NOTHING_LINE
+
+
+# Shoot count words ("all three" is covered by "three"); "shoot (them) all" handled as a phrase
+_SHOOT_COUNT_WORDS = {"three": 3, "3": 3, "two": 2, "2": 2, "both": 2}
+
+
+def _shoot_count(text: str) -> int:
+    """Guards targeted by one shot action: 1 by default, up to 3."""
+    words = _WORD_RE.findall(text.lower())
+    count = 1
+    for i, w in enumerate(words):
+        n = _SHOOT_COUNT_WORDS.get(w)
+        if n is None and w == "all" and i > 0:
+            if words[i - 1] == "shoot" or (words[i - 1] == "them" and i > 1 and words[i - 2] == "shoot"):
+                n = 3
+        if n is not None and n > count:
+            count = n
+            if count == 3:
+                break
+    return count
+
+
+# ---------- Engine patterns (validate_and_apply) ----------
+_ADVICE_QUERY_RE = re.compile(r"\bwhat\s+should\s+i\s+do\b", re.IGNORECASE)
+_MOVE_DEEPER_RE = re.compile(
+    r"\b(walk|move|proceed|advance|head|go|step|explore|"
+    r"make\s+(?:your|my)\s+way|feel\s+(?:your|my)\s+way|grope|"
+    r"run|sprint|dash|charge|rush|jog|hurry|bolt|dive|burrow|crawl|roll|tumble)\b",
+    re.IGNORECASE
+)
+_LOOK_RE = re.compile(
+    r"\b(look(?:\s+around|\s+about)?|examine|inspect|scan|peer|peek|observe|search)\b",
+    re.IGNORECASE
+)
+_USE_TORCH_RE = re.compile(
+    r"(?:\b(use|shine|raise|brandish|wave|aim|point)\b.*\btorch\b|\btorch\b.*\b(use|shine|raise|brandish|wave|aim|point)\b)",
+    re.IGNORECASE
+)
+_SEE_QUERY_RE = re.compile(r"\bwhat\s+(?:can|do)\s+i\s+see\b", re.IGNORECASE)
+
+_TORCH_MENTION_RE = re.compile(r"\b(torch|stick)\b", re.IGNORECASE)
+_STONE_MENTION_RE = re.compile(r"\b(cobblestone|loose\s+stone|stone|rock)\b", re.IGNORECASE)
+_LOCAL_PROBE_RE = re.compile(r"\b(pick\s*up|grab|feel|grope|pat|reach|search)\b", re.IGNORECASE)
+_COAL_MENTION_RE = re.compile(r"\b(coal|coal\s+piles?)\b", re.IGNORECASE)
+_IGNITE_RE = re.compile(r"\b(ignite|light|set|burn)\b", re.IGNORECASE)
+_KNIGHT_OR_HIM_RE = re.compile(r"\b(knight|him)\b", re.IGNORECASE)
+_JUMP_WORD_RE = re.compile(r"\bjump\b", re.IGNORECASE)
+_CLIMB_BACK_UP_RE = re.compile(r"\b(climb|go|head|get)\b(?:\s+back)?\s+\bup\b")
+_CLIMB_DOWN_RE = re.compile(r"\b(climb|descend|go|head|get|drop)\b.*\bdown\b")
+
+# Narration scrubs
+_KNIGHT_RE = re.compile(r"\bknight\b", re.IGNORECASE)
+_KNIGHT_REACTION_RE = re.compile(
+    r"\b(turns?|stumbles?|spins?|lurch(?:es|ed)?|reacts?|flinches?|"
+    r"eyes\s+(?:narrow|widen|wide(?:ns)?)|notic\w*|"
+    r"ducks?|dodg(?:e|es|ed)|avoids?|parries|blocks|"
+    r"stands?|standing|upright|rises?|gets?\s+up)\b",
+    re.IGNORECASE
+)
+_KNIGHT_SENTENCE_RE = re.compile(r"(?<!\S)(?:[^.?!]*\bknight\b[^.?!]*[.?!])")
+_GUARDS_RE = re.compile(r"\bguards?\b", re.IGNORECASE)
+_GUARDS_SENTENCE_RE = re.compile(r"(?<!\S)(?:[^.?!]*\bguards?\b[^.?!]*[.?!])")
+_NOTHING_SPECIAL_TAIL_RE = re.compile(r"\s*Nothing special happened\.\s*$")
+# Svans-formen (även utan föregående blanksteg) eller fristående förekomster – ett pass
+_NOTHING_ANY_RE = re.compile(
+    r"\s*Nothing (?:special )?happened\.\s*$|(?<!\S)Nothing (?:special )?happened\.\s*"
+)
+_ROOM_CLAIM_RE = re.compile(r"\b(?:(?P<hall_01>Great Hall)|(?P<coal_01>Coal Cellar)|(?P<cell_01>Prison Cell))\b", re.IGNORECASE)
+_ROOM_CLAIM_PRIORITY = ("hall_01", "coal_01", "cell_01")
+_DARKNESS_CLAIM_RE = re.compile(
+    r"\b(pitch[- ]?black|total\s+dark(ness)?|can't\s+see|cannot\s+see|blindly|grope|stumble)\b",
+    re.IGNORECASE
+)
+# Billiga substring-förfilter (lowercase): regexen körs bara om något av orden finns
+_DARKNESS_CLAIM_HINTS = ("pitch", "dark", "see", "blind", "grope", "stumble")
+_ROOM_CLAIM_HINTS = ("hall", "cell")  # "cell" täcker även "cellar"
+_TOWER_TOP_CLAIM_HINTS = ("platform", "tower")
+_TOWER_TOP_CLAIM_RE = re.compile(r"\b(platform|tower\s+top|top\s+of\s+the\s+tower)\b", re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_LOOSE_STONE_RE = re.compile(r"\bloose\s+(?:stone|cobblestone)\b", re.IGNORECASE)
+_NOTHING_SPECIAL_END_RE = re.compile(r"\bNothing special happened\.\s*$")
+_GUARD_OBLIVIOUS_RE = re.compile(
+    r"(?:but\s+)?the\s+guard\s+(?:remains\s+)?(?:oblivious|unaware|does(?:\s+not)?\s+notice)[^.]*\.",
+    re.IGNORECASE
+)
+_KNIGHT_KO_LINE_RE = re.compile(
+    r"\bThe knight whirls at the noise; you clash briefly and you knock him out cold\.\b", re.IGNORECASE
+)
+_GUARD_DROPS_RE = re.compile(
+    r"\b(guard|guards)\b.*\b(drop|falls?|fall|crumple|collapse|go\s+down|die|dies)\b", re.IGNORECASE
+)
+_REMAIN_RE = re.compile(r"\b(remain|left)\b", re.IGNORECASE)
+_FALLS_SILENT_RE = re.compile(r"\bfalls silent\b|\bno (?:one|guards) remain\b", re.IGNORECASE)
+
+# Player-input checks on already lowercased text
+_ATTACK_WORDS_RE = re.compile(r"\b(attack|smash|bash|stab|burn|swing)\b")
+_BARE_CLIMB_UP_RE = re.compile(r"^\s*(?:climb|go|head|get)\s+up\s*$")
+_UP_RE = re.compile(r"\bup\b")
+_DOWN_RE = re.compile(r"\bdown\b")
+_MOAT_RE = re.compile(r"\bmoat\b")
+_GRASS_RE = re.compile(r"\b(grass|lawn|ground|down)\b")
+_PLATFORM_SPOT_RE = re.compile(r"\b(platform|here|floor|at\s+my\s+feet)\b")
+_BACK_TO_HALL_EXPLICIT_RE = re.compile(
+    r"\b(?:go|head|run|walk|return|step|enter|open|use)\b.*\b(?:great\s+hall|hall)\b",
+    re.IGNORECASE
+)
+_BACK_TO_HALL_GENERIC_RE = re.compile(r"^\s*(?:go\s+back|head\s+back|back(?:\s+inside)?)\b", re.IGNORECASE)
+
+
+# ---------- Move-intent patterns (infer_move_event) ----------
+_BARE_CRAWL_RE = re.compile(r"^\s*crawl(?:\s+(?:in|down))?\s*$")
+_GO_BACK_RE = re.compile(r"\bgo\s+back\b")
+_INTO_HOLE_RE = re.compile(r"\b(crawl|go|climb|head|move|enter)\b.*\b(hole|opening|crawl(?:space)?)\b")
+_TO_CELLAR_RE = re.compile(r"\b(?:to|towards?)\b.*\b(?:coal\s+cellar|cellar)\b")
+_CRAWL_DOWN_RE = re.compile(r"\bcrawl\s+down\b")
+_CRAWL_BACK_RE = re.compile(r"\bcrawl\b.*\bback\b")
+_HOLE_RE = re.compile(r"\b(hole|opening|crawl(?:space)?)\b")
+_TO_HALL_RE = re.compile(r"\b(go|head|move|walk|step|enter)\b.*\b(great\s+hall|hall)\b")
+_STAIRS_RE = re.compile(r"\b(stair|stairs|staircase|steps?)\b")
+_OPEN_IT_RE = re.compile(r"\bopen\s+it\b")
+_CELLAR_DOOR_RE = re.compile(r"\b(open|unlatch|unlock|go\s+through|enter)\b.*\bdoor\b")
+_TO_CELL_PHRASE_RE = re.compile(r"\b(?:prison\s+cell|the\s+cell)\b")
+_RETURN_TO_CELL_RE = re.compile(r"\b(?:return|go|head|crawl|climb)\b.*\bto\b.*\b(?:prison\s+cell|the\s+cell|cell\b(?!ar))")
+_UNLOCK_IT_RE = re.compile(r"\b(unlock|open)\s+it\b")
+_BARE_UNLOCK_RE = re.compile(r"^\s*(unlock|open)\s*$")
+_COURTYARD_DOOR_RE = re.compile(r"\b(open|unlock|use\s+keys?|go\s+through|enter)\b.*\b(courtyard|heavy)?\s*door\b")
+_GO_BACK_ANY_RE = re.compile(r"\b(return|go\s+back|head\s+back|back)\b")
+_CELLAR_RE = re.compile(r"\b(coal(?:\s+cellar)?|cellar)\b")
+_JUMP_UP_TOWER_RE = re.compile(r"\bjump\b.*\b(up|onto)\b.*\b(tower|platform|ladder)\b")
+_GO_BACK_DOWN_RE = re.compile(r"\bgo\s+back\b.*\b(courtyard|grass|ground|lawn)\b")
+_EXIT_RE = re.compile(r"\b(exit|leave|head\s+out|go\s+out|get\s+out|leave\s+the\s+castle|exit\s+the\s+castle)\b")
+_LADDER_OR_TOWER_RE = re.compile(r"\b(ladder|tower)\b")
+_CLIMB_LADDER_UP_RE = re.compile(r"\bclimb\b.*\bladder\b.*\bup\b")
+_CLIMB_LADDER_DOWN_RE = re.compile(r"\bclimb\b.*\bladder\b.*\bdown\b")
+# Delsträngstester (inte ordgränser) – "go back", "crawl up" osv. täcks av de kortare orden
+_UP_BACK_HINTS = ("back", "return", "up", "climb")
+_CELLAR_GO_HINTS = ("go", "enter", "head", "to")
+
 
 def infer_move_event(current_room: str, text: str) -> Optional[str]:
     t = (text or "").lower()
@@ -694,89 +1231,89 @@ def infer_move_event(current_room: str, text: str) -> Optional[str]:
         # Down through the hole / to the cellar
 
             # NEW: allow bare 'crawl', 'crawl in', or 'crawl down' to mean entering the hole
-        if re.search(r"^\s*crawl(?:\s+(?:in|down))?\s*$", t):
+        if _BARE_CRAWL_RE.search(t):
             return "enter_coal_cellar"
 
         # NEW: 'go back' in the cell means back down into the cellar
-        if re.search(r"\bgo\s+back\b", t):
+        if _GO_BACK_RE.search(t):
             return "enter_coal_cellar"
 
 
-        if re.search(r"\b(crawl|go|climb|head|move|enter)\b.*\b(hole|opening|crawl(?:space)?)\b", t):
+        if _INTO_HOLE_RE.search(t):
             return "enter_coal_cellar"
-        if re.search(r"\b(?:to|towards?)\b.*\b(?:coal\s+cellar|cellar)\b", t):
+        if _TO_CELLAR_RE.search(t):
             return "enter_coal_cellar"
-        if "cellar" in t and any(w in t for w in ["go", "enter", "head", "toward", "to"]):
+        if "cellar" in t and any(w in t for w in _CELLAR_GO_HINTS):
             return "enter_coal_cellar"
         
         # NEW: allow terse phrasing "crawl down" from the cell to the cellar
-        if re.search(r"\bcrawl\s+down\b", t):
+        if _CRAWL_DOWN_RE.search(t):
             return "enter_coal_cellar"
 
                 # short intent like "crawl back" (engine will still gate on stone_moved)
-        if re.search(r"\bcrawl\b.*\bback\b", t) and re.search(r"\b(hole|opening|crawl(?:space)?)\b", t):
+        if _CRAWL_BACK_RE.search(t) and _HOLE_RE.search(t):
             return "enter_coal_cellar"
 
 
 
     elif current_room == "coal_01":
 
-        if re.search(r"\b(go|head|move|walk|step|enter)\b.*\b(great\s+hall|hall)\b", t):
+        if _TO_HALL_RE.search(t):
             return "open_hall_door"
         
 
-        if re.search(r"\b(stair|stairs|staircase|steps?)\b", t):
-            going_down = re.search(r"\bdown\b", t) is not None
-            going_up   = re.search(r"\bup\b", t)   is not None
+        if _STAIRS_RE.search(t):
+            going_down = _DOWN_RE.search(t) is not None
+            going_up   = _UP_RE.search(t)   is not None
             if going_down:
                 return "open_hall_door"
             if going_up:
                 return None  # explicitly do nothing (stay), avoid "return_to_cell"
         
                 # Allow pronoun phrasing: "go to the door and open it"
-        if "door" in t and re.search(r"\bopen\s+it\b", t):
+        if "door" in t and _OPEN_IT_RE.search(t):
             return "open_hall_door"
 
         
         # öppna/gå igenom dörren längst bort i källaren
-        if re.search(r"\b(open|unlatch|unlock|go\s+through|enter)\b.*\bdoor\b", t):
+        if _CELLAR_DOOR_RE.search(t):
             return "open_hall_door"
 
         # Up through the hole or back to (prison) cell
-        up_back = any(w in t for w in ["back", "go back", "head back", "return", "up", "climb", "crawl up", "back up", "go up"])
-        via_hole = re.search(r"\b(hole|opening|crawl(?:space)?)\b", t) is not None
-        to_cell_phrase = re.search(r"\b(?:prison\s+cell|the\s+cell)\b", t) is not None
+        up_back = any(w in t for w in _UP_BACK_HINTS)
+        via_hole = _HOLE_RE.search(t) is not None
+        to_cell_phrase = _TO_CELL_PHRASE_RE.search(t) is not None
         to_cell_generic = _CELL_WORD.search(t) is not None  # 'cell' as a word, not 'cellar'
         if (up_back and via_hole) or (up_back and (to_cell_phrase or to_cell_generic)):
             return "return_to_cell"
-        if re.search(r"\b(?:return|go|head|crawl|climb)\b.*\bto\b.*\b(?:prison\s+cell|the\s+cell|cell\b(?!ar))", t):
+        if _RETURN_TO_CELL_RE.search(t):
             return "return_to_cell"
 
     elif current_room == "hall_01":
 
                 # Pronoun / bare-verb support for the obvious courtyard door
-        if re.search(r"\b(unlock|open)\s+it\b", t) or re.search(r"^\s*(unlock|open)\s*$", t):
+        if _UNLOCK_IT_RE.search(t) or _BARE_UNLOCK_RE.search(t):
             return "unlock_courtyard_door"
 
         # öppna/låsa upp gårdsdörren – behandlas lika (motorn kräver keys i inventory)
-        if re.search(r"\b(open|unlock|use\s+keys?|go\s+through|enter)\b.*\b(courtyard|heavy)?\s*door\b", t):
+        if _COURTYARD_DOOR_RE.search(t):
             return "unlock_courtyard_door"
         # gå tillbaka till källaren
-        if re.search(r"\b(return|go\s+back|head\s+back|back)\b", t) and re.search(r"\b(coal(?:\s+cellar)?|cellar)\b", t):
+        if _GO_BACK_ANY_RE.search(t) and _CELLAR_RE.search(t):
             return "return_to_coal"
         
     elif current_room == "courtyard_01":
 
         # NEW: "jump up to the tower/platform/ladder" should mean climb up the ladder (not moat)
-        if re.search(r"\bjump\b.*\b(up|onto)\b.*\b(tower|platform|ladder)\b", t):
+        if _JUMP_UP_TOWER_RE.search(t):
             return "climb_ladder_up"
 
         # NEW: "go back into/to the courtyard/grass/ground/lawn" means get down from the platform
-        if re.search(r"\bgo\s+back\b.*\b(courtyard|grass|ground|lawn)\b", t):
+        if _GO_BACK_DOWN_RE.search(t):
             return "climb_ladder_down"
 
         # Exit synonyms -> crossing the bridge (validator will require gate lowered)
-        if re.search(r"\b(exit|leave|head\s+out|go\s+out|get\s+out|leave\s+the\s+castle|exit\s+the\s+castle)\b", t):
+        if _EXIT_RE.search(t):
             return "cross_gate_bridge"
         
         if _JUMP_TO_GROUND_RE.search(t):
@@ -786,7 +1323,7 @@ def infer_move_event(current_room: str, text: str) -> Optional[str]:
         if _JUMP_MOAT_RE.search(t):
             return "jump_into_moat"
         # "other side" ska bara tolkas som simning om man inte pratar om stege/torn
-        if _SWIM_RE.search(t) or (_OTHER_SIDE_SWIM_RE.search(t) and not re.search(r"\b(ladder|tower)\b", t)):
+        if _SWIM_RE.search(t) or (_OTHER_SIDE_SWIM_RE.search(t) and not _LADDER_OR_TOWER_RE.search(t)):
             return "swim_across"
 
         # Generiskt "jump down/off/from" → behandla som moat-försök (motorn gate:ar från marken)
@@ -797,9 +1334,9 @@ def infer_move_event(current_room: str, text: str) -> Optional[str]:
             return "climb_ladder_up"
 
         # STEGE före gate/bridge för att undvika falska "run across"
-        if _LADDER_UP_RE.search(t) or re.search(r"\bclimb\b.*\bladder\b.*\bup\b", t):
+        if _LADDER_UP_RE.search(t) or _CLIMB_LADDER_UP_RE.search(t):
             return "climb_ladder_up"
-        if _LADDER_DOWN_RE.search(t) or re.search(r"\bclimb\b.*\bladder\b.*\bdown\b", t):
+        if _LADDER_DOWN_RE.search(t) or _CLIMB_LADDER_DOWN_RE.search(t):
             return "climb_ladder_down"
 
         # Spak/skjuta/gå över bron (endast uttryckliga gate/bridge-ord)
@@ -871,6 +1408,23 @@ def infer_item_events(text: str) -> List[str]:
 
 
 
+def _store_item(state: GameState, name: str, obj: Dict[str, Any]) -> None:
+    """Write an item back and bump the items version."""
+    state.items[name] = obj
+    state._items_version += 1
+
+
+def _hand_slots(items: Dict[str, Dict[str, Any]]) -> Tuple[bool, bool, bool, bool]:
+    """Single-slot hands: (holding_torch, holding_keys, holding_crossbow, slot_occupied)."""
+    torch = items.get("torch")
+    keys = items.get("keys")
+    crossbow = items.get("crossbow")
+    holding_torch = torch is not None and torch.get("location") == "player"
+    holding_keys = keys is not None and keys.get("location") == "player"
+    holding_crossbow = crossbow is not None and crossbow.get("location") == "player"
+    return holding_torch, holding_keys, holding_crossbow, (holding_torch or holding_keys or holding_crossbow)
+
+
 def inventory_items_from_items(state: GameState) -> List[str]:
     torch = state.items.get("torch", {})
     keys = state.items.get("keys", {})
@@ -884,6 +1438,14 @@ def inventory_items_from_items(state: GameState) -> List[str]:
     return []
 
 
+def refresh_inventory(state: GameState) -> List[str]:
+    """Update state.inventory from items, only when the items version has moved."""
+    if state._inventory_version != state._items_version:
+        state.inventory = inventory_items_from_items(state)
+        state._inventory_version = state._items_version
+    return state.inventory
+
+
 
 def torch_light_present_here(state: GameState) -> bool:
     """Is there torchlight in the current room (carried or placed lit here)?"""
@@ -896,6 +1458,10 @@ def torch_light_present_here(state: GameState) -> bool:
 
 def sync_flags_with_items(state: GameState) -> None:
     """Keep legacy flags in sync for LLM context (mirror light to specific rooms)."""
+    key = (state._items_version, state.current_room)
+    if state._synced_key == key:
+        return
+    state._synced_key = key
     torch = state.items.get("torch", {})
     holding = (torch.get("location") == "player")
     lit_global = bool(torch.get("lit", False))
@@ -1008,44 +1574,6 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
     def _set_narr(msg: str):
         llm.narration = msg
 
-    # ----- Local intent regex (kept local so you can paste this function alone) -----
-    import re as _re
-
-    ADVICE_QUERY_RE = _re.compile(r"\bwhat\s+should\s+i\s+do\b", _re.IGNORECASE)
-
-    MOVE_DEEPER_RE = _re.compile(
-        r"\b(walk|move|proceed|advance|head|go|step|explore|"
-        r"make\s+(?:your|my)\s+way|feel\s+(?:your|my)\s+way|grope|"
-        r"run|sprint|dash|charge|rush|jog|hurry|bolt|dive|burrow|crawl|roll|tumble)\b",
-        _re.IGNORECASE
-    )
-    LOOK_RE = _re.compile(
-        r"\b(look(?:\s+around|\s+about)?|examine|inspect|scan|peer|peek|observe|search)\b",
-        _re.IGNORECASE
-    )
-    USE_TORCH_RE = _re.compile(
-        r"(?:\b(use|shine|raise|brandish|wave|aim|point)\b.*\btorch\b|\btorch\b.*\b(use|shine|raise|brandish|wave|aim|point)\b)",
-        _re.IGNORECASE
-    )
-    SEE_QUERY_RE = _re.compile(r"\bwhat\s+(?:can|do)\s+i\s+see\b", _re.IGNORECASE)
-
-    # Courtyard-specific intents
-    _SHOOT_RE = _re.compile(r"\b(shoot|fire|loose|let\s+fly|squeeze(?:\s+the)?\s+trigger|aim\s+and\s+fire)\b", _re.IGNORECASE)
-    _ALL_THREE_RE = _re.compile(r"\b(all\s+three|all\s+3|three|3|shoot\s+them\s+all|shoot\s+all)\b", _re.IGNORECASE)
-    _TWO_RE = _re.compile(r"\b(two|2|both)\b", _re.IGNORECASE)
-    _LADDER_UP_RE = _re.compile(
-        r"\b(climb|go|head|get)\b.*\b(?:up\s+(?:the\s+)?(?:ladder|tower)|ladder\s+up|up\s+the\s+ladder)\b",
-        _re.IGNORECASE
-    )
-    _LADDER_DOWN_RE = _re.compile(
-        r"\b(climb|go|head|get)\b.*\b(?:down\s+(?:the\s+)?ladder|ladder\s+down|down\s+the\s+ladder)\b",
-        _re.IGNORECASE
-    )
-    _LEVER_RE = _re.compile(r"\b(pull|yank|throw|press)\b.*\b(lever)\b", _re.IGNORECASE)
-    _JUMP_MOAT_RE = _re.compile(r"\b(jump)\b.*\b(moat)\b", _re.IGNORECASE)
-    _SWIM_RE = _re.compile(r"\b(swim|swim\s+across|cross\s+the\s+moat)\b", _re.IGNORECASE)
-    _CROSSBOW_RE = _re.compile(r"\b(crossbow|bow|weapon)\b", _re.IGNORECASE)
-
     # --- snapshots/intent för stenlogik i cellen ---
     was_stone_moved_before = False
     attempted_move_stone_input = False
@@ -1074,16 +1602,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         notes.append(f"Noise coerced from {llm.noise_level} to {noise}.")
 
     # Strictly filter flags reported by the LLM to what is allowed for the current room
-    if state.current_room == "cell_01":
-        allowed_flags = ALLOWED_CELL_FLAGS
-    elif state.current_room == "coal_01":
-        allowed_flags = ALLOWED_COAL_FLAGS
-    elif state.current_room == "hall_01":
-        allowed_flags = ALLOWED_HALL_FLAGS
-    elif state.current_room == "courtyard_01":
-        allowed_flags = globals().get("ALLOWED_COURTYARD_FLAGS", {"at_tower_top", "gate_lowered", "guards_present"})
-    else:
-        allowed_flags = set()
+    allowed_flags = _ALLOWED_FLAGS_BY_ROOM.get(state.current_room, frozenset())
     if llm.flags_set:
         original_flags = list(llm.flags_set)
         llm.flags_set = [f for f in llm.flags_set if f in allowed_flags]
@@ -1125,7 +1644,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
     # Straw rummage => deterministiskt: hitta den lösa stenen denna tur
     if state.current_room == "cell_01" and not state.flags_cell["found_loose_stone"]:
-        if _re.search(r"\b(straw|hay|straw\s*bed|bed)\b", player_action_text or "", flags=_re.IGNORECASE):
+        if _STRAW_RE.search(player_action_text or ""):
             if "straw_rummaged" not in events:
                 events.append("straw_rummaged")
             state.flags_cell["found_loose_stone"] = True
@@ -1134,13 +1653,13 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             orig = (llm.narration or "").strip()
             first = ""
             if orig:
-                parts = re.split(r"(?<=[.!?])\s+", orig)
+                parts = _SENTENCE_SPLIT_RE.split(orig)
                 first = (parts[0] or "").strip()
             fixed = "You notice a loose cobblestone underneath the straw bed."
 
             # Avoid duplicating if the LLM already said it
-            already_said = re.search(r"\bloose\s+(?:stone|cobblestone)\b", orig, re.IGNORECASE)
-            if first and not already_said and not re.search(r"\bNothing special happened\.\s*$", first):
+            already_said = _LOOSE_STONE_RE.search(orig)
+            if first and not already_said and not _NOTHING_SPECIAL_END_RE.search(first):
                 llm.narration = f"{first} {fixed}"
             else:
                 llm.narration = fixed
@@ -1154,7 +1673,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
         # --- Drop hallucinated item events not mentioned by the player ---
     t_input = (player_action_text or "")
-    mentioned_torch_input = _re.search(r"\b(torch|stick)\b", t_input, _re.IGNORECASE) is not None
+    mentioned_torch_input = _TORCH_MENTION_RE.search(t_input) is not None
     mentioned_keys_input  = _KEYS_RE.search(t_input) is not None
     mentioned_xbow_input  = _CROSSBOW_RE.search(t_input) is not None
 
@@ -1225,20 +1744,20 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             notes.append("Ignored 'gate_lowered' flag without pulling the lever at the tower top.")
 
     # Convert drop+extinguish user intent into 'extinguish_torch'
-    if "drop_torch" in events and _re.search(r"\b(extinguish|snuff|put\s+out|douse|blow\s+out|quench)\b", player_action_text or "", _re.IGNORECASE):
+    if "drop_torch" in events and _EXTINGUISH_RE.search(player_action_text or ""):
         events = ["extinguish_torch" if e == "drop_torch" else e for e in events]
         notes.append("Converted 'drop_torch' to 'extinguish_torch' based on player intent.")
 
     # Guard: disallow straw rummage unless player actually mentions straw/hay/bed
     if state.current_room == "cell_01":
-        straw_mentioned = _re.search(r"\b(straw|hay|straw\s*bed|bed)\b", player_action_text or "", flags=_re.IGNORECASE) is not None
+        straw_mentioned = _STRAW_RE.search(player_action_text or "") is not None
         if ("straw_rummaged" in events) and (not straw_mentioned):
             notes.append("Removed 'straw_rummaged' since player did not mention straw/hay/bed.")
             events = [e for e in events if e != "straw_rummaged"]
             if "found_loose_stone" in llm.flags_set:
                 llm.flags_set = [f for f in llm.flags_set if f != "found_loose_stone"]
             if not state.flags_cell["found_loose_stone"]:
-                llm.narration = "You look around the cell. Nothing special happened."
+                llm.narration = _nothing("You look around the cell.")
 
     # Cell: infer lifting the loose stone deterministically
     if state.current_room == "cell_01" and state.flags_cell.get("found_loose_stone", False) and not state.flags_cell.get("stone_moved", False):
@@ -1250,7 +1769,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
         # Cell: any non-key interaction with the loose cobblestone -> playful denial
     if state.current_room == "cell_01":
-        mentions_stone = _re.search(r"\b(cobblestone|loose\s+stone|stone|rock)\b", t_input, _re.IGNORECASE) is not None
+        mentions_stone = _STONE_MENTION_RE.search(t_input) is not None
         did_key_stone = ("stone_lifted" in events) or ("enter_coal_cellar" in events)
         if mentions_stone and not did_key_stone:
             # Städa bort spuriösa item-events som LLM kan ha kastat in när man leker med stenen
@@ -1260,7 +1779,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 "pickup_crossbow","drop_crossbow"
             }]
             # Låt ev. guard_punishes pga oväsen i cellen vara kvar; resten blir en färgad denial.
-            llm.narration = "You fumble with the loose stone, but it won’t serve as a tool—only as a lid. Nothing special happened."
+            llm.narration = _nothing("You fumble with the loose stone, but it won’t serve as a tool—only as a lid.")
 
 
     # ---------------- Darkness intent inference (engine-level guard) ----------------
@@ -1268,8 +1787,8 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
     if dark_here:
         # If the player is trying to move deeper in the cellar (not returning up), force a stumble.
         # But don't punish stationary groping/feeling/picking up the nearby object.
-        local_probe = _re.search(r"\b(pick\s*up|grab|feel|grope|pat|reach|search)\b", player_action_text or "", _re.IGNORECASE)
-        if MOVE_DEEPER_RE.search(player_action_text or "") and "return_to_cell" not in events and not local_probe:
+        local_probe = _LOCAL_PROBE_RE.search(player_action_text or "")
+        if _MOVE_DEEPER_RE.search(player_action_text or "") and "return_to_cell" not in events and not local_probe:
             if "dark_stumble" not in events:
                 events.append("dark_stumble")
                 notes.append("Auto-injected 'dark_stumble' due to moving in darkness in coal_01.")
@@ -1286,10 +1805,10 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
     # Försök att tända kolhögarna i källaren: alltid realistiskt avslag
     if state.current_room == "coal_01":
-        if _re.search(r"\b(coal|coal\s+piles?)\b", player_action_text or "", _re.IGNORECASE) and \
-           _re.search(r"\b(ignite|light|set|burn)\b", player_action_text or "", _re.IGNORECASE):
-            llm.narration = ("You try to ignite the coal, but the dust is damp and there's no draft—"
-                             "nothing catches. Nothing special happened.")
+        if _COAL_MENTION_RE.search(player_action_text or "") and \
+           _IGNITE_RE.search(player_action_text or ""):
+            llm.narration = _nothing("You try to ignite the coal, but the dust is damp and there's no draft—"
+                                     "nothing catches.")
 
     # ---------------- HP / Punishments ----------------
     enforced_hp_delta = 0
@@ -1299,11 +1818,8 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         if noise >= 2:
             enforced_hp_delta = -20
             # Scrub contradictory 'oblivious/unaware' lines this turn (guard reacts)
-            llm.narration = re.sub(
-                r"(?:but\s+)?the\s+guard\s+(?:remains\s+)?(?:oblivious|unaware|does(?:\s+not)?\s+notice)[^.]*\.",
-                "", llm.narration, flags=re.IGNORECASE
-            ).strip()
-            llm.narration = re.sub(r"\s*Nothing special happened\.\s*$", "", llm.narration).strip()
+            llm.narration = _GUARD_OBLIVIOUS_RE.sub("", llm.narration).strip()
+            llm.narration = _NOTHING_SPECIAL_TAIL_RE.sub("", llm.narration).strip()
 
             cause = "Guard strikes you for disturbing his slumber"
             if llm.hp_delta != -20:
@@ -1341,13 +1857,13 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         # Räknas som icke-attack (t.ex. "drop the torch and take the keys")
         non_attack_item_action = (_DROP_RE.search(lower_action) is not None) or (_PICK_RE.search(lower_action) is not None)
         # Riktiga våldsintentioner (verb), inte bara ordet "torch"
-        attack_intent = (HIT_VERBS_RE.search(lower_action) is not None) or re.search(r"\b(attack|smash|bash|stab|burn|swing)\b", lower_action)
+        attack_intent = (HIT_VERBS_RE.search(lower_action) is not None) or _ATTACK_WORDS_RE.search(lower_action)
 
 
         # Rensa bort falsk riddarstrid om noise < 2
         if noise < 2:
-            if any(e in {"knight_notice", "combat_knock_guard"} for e in events):
-                events = [e for e in events if e not in {"knight_notice", "combat_knock_guard"}]
+            if not _KNIGHT_COMBAT_EVENTS.isdisjoint(events):
+                events = [e for e in events if e not in _KNIGHT_COMBAT_EVENTS]
                 notes.append("Removed knight events because noise < 2 in hall.")
 
 
@@ -1358,7 +1874,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             scrubbed_illegal_events = True
 
             if not state.flags_hall["courtyard_door_unlocked"]:
-                llm.narration = "The courtyard door is locked. Nothing special happened."
+                llm.narration = _nothing("The courtyard door is locked.")
 
         # Stage 2: Knight combat if too noisy and not already knocked out
         if noise >= 2 and not state.flags_hall["knight_knocked_out"]:
@@ -1374,15 +1890,15 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             state.flags_hall["knight_knocked_out"] = True  # permanently unconscious
 
             # strengthen narration
-            if llm.narration and llm.narration[-1] not in ".!?":
+            if llm.narration and not llm.narration.endswith(_SENTENCE_END):
                 llm.narration += "."
             # Keep up to one short flavor sentence, then canonical KO line
             orig = (llm.narration or "").strip()
             flavor = ""
-            parts = re.split(r"(?<=[.!?])\s+", orig) if orig else []
+            parts = _SENTENCE_SPLIT_RE.split(orig) if orig else []
             if parts and parts[0]:
                 first = parts[0].strip()
-                if not re.search(r"\bThe knight whirls at the noise; you clash briefly and you knock him out cold\.\b", first, re.IGNORECASE):
+                if not _KNIGHT_KO_LINE_RE.search(first):
                     flavor = first[:140].strip()  # short flavor
 
             fixed = "The knight whirls at the noise; you clash briefly and you knock him out cold."
@@ -1392,32 +1908,24 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         # If the knight is already out, scrub any new notice/combat and correct the tone
         if was_knight_out_before:
             # Ta bort stridshändelser
-            if any(e in {"knight_notice", "combat_knock_guard"} for e in events):
-                events = [e for e in events if e not in {"knight_notice", "combat_knock_guard"}]
+            if not _KNIGHT_COMBAT_EVENTS.isdisjoint(events):
+                events = [e for e in events if e not in _KNIGHT_COMBAT_EVENTS]
                 notes.append("Removed knight events after he was already unconscious.")
 
-            mentions_knight_input = _re.search(r"\b(knight|him)\b", t_input, _re.IGNORECASE) is not None
+            mentions_knight_input = _KNIGHT_OR_HIM_RE.search(t_input) is not None
             # Om spelaren faktiskt försöker göra något mot riddaren → fast no-effect-rad
-            if (mentions_knight_input and (attack_intent or LOOK_RE.search(t_input) is not None)) and not non_attack_item_action:
+            if (mentions_knight_input and (attack_intent or _LOOK_RE.search(t_input) is not None)) and not non_attack_item_action:
                 llm.narration = "The knight is unconscious on the ground. Further actions against him have no effect."
             else:
                 # Rensa LLM-påhitt om att han reagerar, men bevara övrig flavor
-                REACTION_RE = _re.compile(
-                    r"\b(turns?|stumbles?|spins?|lurch(?:es|ed)?|reacts?|flinches?|"
-                    r"eyes\s+(?:narrow|widen|wide(?:ns)?)|notic\w*|"
-                    r"ducks?|dodg(?:e|es|ed)|avoids?|parries|blocks|"
-                    r"stands?|standing|upright|rises?|gets?\s+up)\b",
-                    _re.IGNORECASE
-                )
-                if _re.search(r"\bknight\b", llm.narration or "", _re.IGNORECASE) and REACTION_RE.search(llm.narration or ""):
+                if "knight" in (llm.narration or "").lower() and _KNIGHT_RE.search(llm.narration or "") \
+                        and _KNIGHT_REACTION_RE.search(llm.narration or ""):
                     # Ta bort meningar om riddares reaktion, lämna resten och lägg en stilla markör.
-                    llm.narration = _re.sub(r"(?<!\S)(?:[^.?!]*\bknight\b[^.?!]*[.?!])", "", llm.narration).strip()
+                    llm.narration = _KNIGHT_SENTENCE_RE.sub("", llm.narration).strip()
                     if not llm.narration:
                         llm.narration = "Pillars and portraits look on; the knight lies motionless."
                     else:
-                        if llm.narration[-1] not in ".!?":
-                            llm.narration += "."
-                        llm.narration += " The knight lies motionless."
+                        llm.narration = _append_sentence(llm.narration, "The knight lies motionless.")
 
 
 
@@ -1425,8 +1933,9 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
         # Clamp narration claiming to pass through the courtyard door without actually unlocking
         if not state.flags_hall["courtyard_door_unlocked"] and not room_transition:
-            if re.search(r"\b(walk|go|step|move|slip)\b.*\b(through|into|out)\b.*\b(courtyard|door)\b", llm.narration, re.IGNORECASE):
-                llm.narration = "The courtyard door is locked. Nothing special happened."
+            words = _WORD_RE.findall(llm.narration.lower())
+            if _words_in_order(words, _PASS_VERBS, _PASS_PREPS, _PASS_TARGETS):
+                llm.narration = _nothing("The courtyard door is locked.")
 
         # Rörelse tillbaka
                 # Rörelse tillbaka
@@ -1450,19 +1959,17 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             if inferred != "unlock_courtyard_door":
                 notes.append("Blocked courtyard unlock due to missing explicit input intent.")
                 events = [e for e in events if e != "unlock_courtyard_door"]
-                llm.narration = "You’re by a heavy door, but you haven’t committed to unlocking it. Nothing special happened."
+                llm.narration = _nothing("You’re by a heavy door, but you haven’t committed to unlocking it.")
             else:
                 keys = state.items.get("keys", {})
                 if keys.get("location") == "player":
                     if not state.flags_hall["courtyard_door_unlocked"]:
                         state.flags_hall["courtyard_door_unlocked"] = True
                     room_transition = "courtyard_01"
-                    if llm.narration and llm.narration[-1] not in ".!?":
-                        llm.narration += "."
-                    llm.narration = (llm.narration + " You pull the heavy door open and step out into the night air of the courtyard.").strip()
+                    llm.narration = _append_sentence(llm.narration, "You pull the heavy door open and step out into the night air of the courtyard.")
                 else:
                     notes.append("Tried to unlock courtyard door without keys.")
-                    llm.narration = "The door is locked and you have no keys. Nothing special happened."
+                    llm.narration = _nothing("The door is locked and you have no keys.")
 
 
     elif state.current_room == "courtyard_01":
@@ -1472,14 +1979,14 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         # NEW: bare "climb up" (no 'ladder'/'tower' words) while on grass (not in moat)
         if (not state.flags_courtyard.get("at_tower_top", False)) \
             and (not state.flags_courtyard.get("in_moat", False)) \
-            and re.search(r"^\s*(?:climb|go|head|get)\s+up\s*$", t_lower) \
+            and _BARE_CLIMB_UP_RE.search(t_lower) \
             and "climb_ladder_up" not in events:
                 events.append("climb_ladder_up")
                 notes.append("Inferred 'climb_ladder_up' from bare 'climb up' while on the grass.")
 
         if "climb_ladder_up" in events and "climb_ladder_down" in events:
-            up_asked = re.search(r"\bup\b", t_lower) is not None
-            down_asked = re.search(r"\bdown\b", t_lower) is not None
+            up_asked = _UP_RE.search(t_lower) is not None
+            down_asked = _DOWN_RE.search(t_lower) is not None
             at_top_before = bool(state.flags_courtyard.get("at_tower_top", False))
 
             if up_asked and not down_asked:
@@ -1498,7 +2005,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                     notes.append("Resolved ladder conflict by position: kept up (was on grass).")
 
                 if (not state.flags_courtyard.get("at_tower_top", False)) and (not state.flags_courtyard.get("in_moat", False)):
-                    if _re.search(r"\b(climb|go|head|get)\b(?:\s+back)?\s+\bup\b", t_lower) \
+                    if _CLIMB_BACK_UP_RE.search(t_lower) \
                     and "climb_ladder_up" not in events:
                         events.append("climb_ladder_up")
                         notes.append("Inferred 'climb_ladder_up' from bare 'climb up' while on the grass.")
@@ -1509,7 +2016,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             events = [e for e in events if e != "climb_ladder_up"]
             if not ("pull_lever" in events or "shoot_guard" in events or "cross_gate_bridge" in events
                     or "jump_into_moat" in events or "swim_across" in events):
-                llm.narration = "You’re already on the platform. Nothing special happened."
+                llm.narration = _nothing("You’re already on the platform.")
 
         
 
@@ -1520,24 +2027,16 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 events = [e for e in events if e != "shoot_guard"]
                 notes.append("Removed 'shoot_guard' since no guards are present yet.")
             # städa narration som påstår att vakter står där
-            if _re.search(r"\bguards?\b", llm.narration or "", _re.IGNORECASE) and "guards_arrive" not in events:
-                llm.narration = _re.sub(r"(?<!\S)(?:[^.?!]*\bguards?\b[^.?!]*[.?!])", "", llm.narration).strip()
+            if _GUARDS_RE.search(llm.narration or "") and "guards_arrive" not in events:
+                llm.narration = _GUARDS_SENTENCE_RE.sub("", llm.narration).strip()
                 if not llm.narration:
                     llm.narration = "The courtyard is quiet; no guards are on the lawn."
 
 
 
                 # --- Courtyard back-to-hall denial ---
-        BACK_TO_HALL_EXPLICIT = re.compile(
-            r"\b(?:go|head|run|walk|return|step|enter|open|use)\b.*\b(?:great\s+hall|hall)\b",
-            re.IGNORECASE
-        )
-        BACK_TO_HALL_GENERIC  = re.compile(
-            r"^\s*(?:go\s+back|head\s+back|back(?:\s+inside)?)\b",
-            re.IGNORECASE
-        )
-        if BACK_TO_HALL_EXPLICIT.search(player_action_text or "") or BACK_TO_HALL_GENERIC.search(player_action_text or ""):
-            llm.narration = "You eye the door back to the hall, but it’s locked behind you—and turning back would be suicide. Nothing special happened."
+        if _BACK_TO_HALL_EXPLICIT_RE.search(player_action_text or "") or _BACK_TO_HALL_GENERIC_RE.search(player_action_text or ""):
+            llm.narration = _nothing("You eye the door back to the hall, but it’s locked behind you—and turning back would be suicide.")
             notes.append("Blocked attempt to go back into the hall from the courtyard.")
             # städa bort ev. felaktiga 'unlock' händelser som LLM hittat på
             events = [e for e in events if e != "unlock_courtyard_door"]
@@ -1552,7 +2051,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 # Om du redan är på plattformen: tolka bar "climb down"/"descend" som steg-ner
         
         if state.flags_courtyard.get("at_tower_top", False):
-            if _re.search(r"\b(climb|descend|go|head|get|drop)\b.*\bdown\b", t_lower) \
+            if _CLIMB_DOWN_RE.search(t_lower) \
                and "climb_ladder_down" not in events and "jump_into_moat" not in events:
                 events.append("climb_ladder_down")
                 notes.append("Inferred 'climb_ladder_down' from bare 'climb down' while at tower top.")
@@ -1565,12 +2064,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         t = (player_action_text or "").lower()
         shoot_count = 0
         if "shoot_guard" in events:
-            if _ALL_THREE_RE.search(t):
-                shoot_count = 3
-            elif _TWO_RE.search(t):
-                shoot_count = 2
-            else:
-                shoot_count = 1
+            shoot_count = _shoot_count(t)
 
         # Cannot reach the ladder from the moat
         if state.flags_courtyard.get("in_moat", False) and (
@@ -1578,30 +2072,26 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         ):
             notes.append("Denied ladder movement from the moat.")
             events = [e for e in events if e not in {"climb_ladder_up", "climb_ladder_down"}]
-            _set_narr("The ladder is well above the waterline. You can’t reach it from the moat. Nothing special happened.")
+            _set_narr(_nothing("The ladder is well above the waterline. You can’t reach it from the moat."))
 
         # Movement on the ladder
         if "climb_ladder_up" in events:
             state.flags_courtyard["at_tower_top"] = True
             state.flags_courtyard["in_moat"] = False
-            if llm.narration and llm.narration[-1] not in ".!?":
-                llm.narration += "."
             llm.narration = "You climb the ladder and step onto the small platform."
 
         # Ignore ladder-down if already on the grass
         if "climb_ladder_down" in events and not state.flags_courtyard.get("at_tower_top", False):
             events = [e for e in events if e != "climb_ladder_down"]
             if not ("pull_lever" in events or "shoot_guard" in events or "cross_gate_bridge" in events or "jump_into_moat" in events or "swim_across" in events):
-                llm.narration = "You’re already on the grass. Nothing special happened."
+                llm.narration = _nothing("You’re already on the grass.")
 
 
 
         if "climb_ladder_down" in events:
             state.flags_courtyard["at_tower_top"] = False
             state.flags_courtyard["in_moat"] = False
-            if llm.narration and llm.narration[-1] not in ".!?":
-                llm.narration += "."
-            if _re.search(r"\bjump\b", player_action_text or "", _re.IGNORECASE):
+            if _JUMP_WORD_RE.search(player_action_text or ""):
                 llm.narration = "You jump down to the grass, knees jolting."
             else:
                 llm.narration = "You climb back down to the grass."
@@ -1610,7 +2100,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         if "pull_lever" in events:
             if not state.flags_courtyard.get("at_tower_top", False):
                 notes.append("Tried to pull lever from the ground; denied.")
-                llm.narration = "The lever is out of reach from the ground. You’ll need to climb up the ladder first. Nothing special happened."
+                llm.narration = _nothing("The lever is out of reach from the ground. You’ll need to climb up the ladder first.")
                 # ta bort lever-relaterade events den här turen
                 events = [e for e in events if e not in {"pull_lever", "guards_arrive"}]
             else:
@@ -1623,9 +2113,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                         state.flags_courtyard["guards_remaining"] = 3
                     if "guards_arrive" not in events:
                         events.append("guards_arrive")
-                    if llm.narration and llm.narration[-1] not in ".!?":
-                        llm.narration += "."
-                    llm.narration = (llm.narration + " With a thunderous slam the gate drops into a bridge, and three armored guards sprint across the lawn toward you.").strip()
+                    llm.narration = _append_sentence(llm.narration, "With a thunderous slam the gate drops into a bridge, and three armored guards sprint across the lawn toward you.")
                 else:
                     notes.append("Lever pulled again; gate already lowered — no new guards spawned.")
 
@@ -1655,18 +2143,15 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 )
 
                 # Om LLM inte redan uttryckligen beskriver att en vakt faller – lägg till vår tydliga rad
-                if not re.search(r"\b(guard|guards)\b.*\b(drop|falls?|fall|crumple|collapse|go\s+down|die|dies)\b",
-                                llm.narration or "", re.IGNORECASE):
-                    if llm.narration and llm.narration.strip() and llm.narration.strip()[-1] not in ".!?":
-                        llm.narration += "."
-                    llm.narration = (llm.narration + " " + shot_line).strip() if llm.narration else shot_line
+                if not _GUARD_DROPS_RE.search(llm.narration or ""):
+                    llm.narration = _append_sentence(llm.narration, shot_line)
 
                 # Lägg alltid till återstående antal/”lawn falls silent” om det inte redan sägs
                 if state.flags_courtyard["guards_remaining"] > 0:
-                    if not re.search(r"\b(remain|left)\b", llm.narration, re.IGNORECASE):
+                    if not _REMAIN_RE.search(llm.narration):
                         llm.narration += f" {state.flags_courtyard['guards_remaining']} remain."
                 else:
-                    if not re.search(r"\bfalls silent\b|\bno (?:one|guards) remain\b", llm.narration, re.IGNORECASE):
+                    if not _FALLS_SILENT_RE.search(llm.narration):
                         llm.narration += " The lawn falls silent."
 
 
@@ -1679,12 +2164,10 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 cause = "You plunge into the moat"
                 state.flags_courtyard["in_moat"] = True
                 state.flags_courtyard["at_tower_top"] = False
-                if llm.narration and llm.narration[-1] not in ".!?":
-                    llm.narration += "."
-                llm.narration = (llm.narration + " You leap from the platform, plummet thirty meters, and crash into the cold water.").strip()
+                llm.narration = _append_sentence(llm.narration, "You leap from the platform, plummet thirty meters, and crash into the cold water.")
             else:
                 notes.append("Jump into moat attempted from ground; denied.")
-                llm.narration = "Jumping here would be pointless—and painful. Climb the tower and jump into the moat if you dare. Nothing special happened."
+                llm.narration = _nothing("Jumping here would be pointless—and painful. Climb the tower and jump into the moat if you dare.")
                 events = [e for e in events if e != "jump_into_moat"]
 
 
@@ -1695,7 +2178,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 pending_victory_via_swim = True
             else:
                 notes.append("Tried to swim across while not in the moat; denied.")
-                llm.narration = "You're not in the moat. Nothing special happened."
+                llm.narration = _nothing("You're not in the moat.")
                 events = [e for e in events if e != "swim_across"]
 
 
@@ -1704,17 +2187,17 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         if "cross_gate_bridge" in events:
             if not state.flags_courtyard.get("gate_lowered", False):
                 notes.append("Tried to cross but gate not lowered.")
-                _set_narr("The gate is still up; there is no bridge to cross. Nothing special happened.")
+                _set_narr(_nothing("The gate is still up; there is no bridge to cross."))
             elif state.flags_courtyard.get("in_moat", False):
                 notes.append("Tried to cross from the moat.")
-                _set_narr("You’re in the moat; you’ll need to reach the bank first. Nothing special happened.")
+                _set_narr(_nothing("You’re in the moat; you’ll need to reach the bank first."))
             elif state.flags_courtyard.get("at_tower_top", False):
                 notes.append("Tried to cross from tower top.")
-                _set_narr("You’ll have to climb down to the grass first. Nothing special happened.")
+                _set_narr(_nothing("You’ll have to climb down to the grass first."))
             else:
                 if state.flags_courtyard.get("guards_present", False) and int(state.flags_courtyard.get("guards_remaining", 0)) > 0:
                     notes.append("Tried to cross while guards remain; denied.")
-                    _set_narr("The guards block the bridge, weapons raised. Deal with them first. Nothing special happened.")
+                    _set_narr(_nothing("The guards block the bridge, weapons raised. Deal with them first."))
                 else:
                     pending_victory_via_gate = True
 
@@ -1732,86 +2215,57 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         # Schedule victory flags (main loop resolves death before victory)
         if pending_victory_via_gate:
             game_won = True
-            if llm.narration and llm.narration[-1] not in ".!?":
-                llm.narration += "."
             llm.narration = "You sprint across the lowered gate and vanish into the treeline beyond."
 
         if pending_victory_via_swim:
             game_won = True
-            if llm.narration and llm.narration[-1] not in ".!?":
-                llm.narration += "."
             llm.narration = "You swim hard, scramble up the far bank, and disappear into the forest."
 
     # ---------------- Derive flags from events ----------------
-    if state.current_room == "cell_01":
-        event_to_flag = {
-            "stone_lifted": "stone_moved",
-            "stone_moved": "stone_moved",
-            "straw_rummaged": "found_loose_stone",
-            "enter_coal_cellar": "entered_hole",
-            "light_torch": "torch_lit",
-        }
-    else:
-        event_to_flag = {
-            "pickup_stick": "has_torch_stick",
-            "pickup_torch": "has_torch_stick",
-            "light_torch": "torch_lit",
-            "pull_lever": "gate_lowered",  # Courtyard convenience
-        }
-    for e in list(events or []):
+    event_to_flag = _EVENT_TO_FLAG_CELL if state.current_room == "cell_01" else _EVENT_TO_FLAG_OTHER
+    # llm_flags speglar llm.flags_set som mängd för snabba medlemskapstester nedan
+    llm_flags = set(llm.flags_set)
+    for e in events or ():
         f = event_to_flag.get(e)
-        if f and f not in llm.flags_set:
+        if f and f not in llm_flags:
+            llm_flags.add(f)
             llm.flags_set.append(f)
 
     # ---------------- Apply cell flags (ordered) ----------------
     new_flags: List[str] = []
 
     if state.current_room == "cell_01":
-        # found_loose_stone requires actual straw interaction
-        if ("found_loose_stone" in llm.flags_set) and (not state.flags_cell["found_loose_stone"]):
-            if ("straw_rummaged" in events) or ("stone_revealed" in events) or _re.search(r"\b(straw|hay|straw\s*bed|bed)\b", player_action_text or "", flags=_re.IGNORECASE):
-                state.flags_cell["found_loose_stone"] = True
-                new_flags.append("found_loose_stone")
-            else:
+        for flag, prereq in _CELL_FLAG_CHAIN:
+            if flag not in llm_flags:
+                continue
+            if prereq and not state.flags_cell[prereq]:
+                notes.append(f"Cannot set '{flag}' before '{prereq}'. Ignored.")
+                continue
+            if state.flags_cell[flag]:
+                continue
+            # found_loose_stone requires actual straw interaction
+            if flag == "found_loose_stone" and not (
+                ("straw_rummaged" in events) or ("stone_revealed" in events) or _STRAW_RE.search(player_action_text or "")
+            ):
                 notes.append("Ignored 'found_loose_stone' without straw interaction.")
-
-        # stone_moved requires found_loose_stone first
-        if "stone_moved" in llm.flags_set:
-            if state.flags_cell["found_loose_stone"] and not state.flags_cell["stone_moved"]:
-                state.flags_cell["stone_moved"] = True
-                new_flags.append("stone_moved")
-            elif not state.flags_cell["found_loose_stone"]:
-                notes.append("Cannot set 'stone_moved' before 'found_loose_stone'. Ignored.")
-
-        if "entered_hole" in llm.flags_set:
-            if state.flags_cell["stone_moved"] and not state.flags_cell["entered_hole"]:
-                state.flags_cell["entered_hole"] = True
-                new_flags.append("entered_hole")
-            elif not state.flags_cell["stone_moved"]:
-                notes.append("Cannot set 'entered_hole' before 'stone_moved'. Ignored.")
+                continue
+            state.flags_cell[flag] = True
+            new_flags.append(flag)
 
     # ---------------- Inventory & item events ----------------
     torch = state.items.get("torch", {"location": "coal_01", "lit": False})
     keys = state.items.get("keys", {"location": "hall_01"})
     crossbow = state.items.get("crossbow", {"location": "courtyard_tower_top"})
-    holding_torch = (torch["location"] == "player")
-    holding_keys  = (keys["location"]  == "player")
-    holding_crossbow = (crossbow["location"] == "player")
-    slot_occupied = holding_torch or holding_keys or holding_crossbow
-
-    def _recalc_slot():
-        nonlocal holding_torch, holding_keys, holding_crossbow, slot_occupied
-        holding_torch = (state.items.get("torch", {}).get("location") == "player")
-        holding_keys = (state.items.get("keys", {}).get("location") == "player")
-        holding_crossbow = (state.items.get("crossbow", {}).get("location") == "player")
-        slot_occupied = holding_torch or holding_keys or holding_crossbow
+    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
+    # sync_flags_with_items läser bara facklans plats/ljus – synka bara om de ändras nedan
+    torch_before = (torch.get("location"), torch.get("lit"), "torch" in state.items)
 
 
         # 0) Process THROWS (separat från drops)
     if "throw_keys" in events or "throw_crossbow" in events:
         t_text = (player_action_text or "").lower()
-        to_moat  = re.search(r"\bmoat\b", t_text) is not None
-        to_grass = (re.search(r"\b(grass|lawn|ground|down)\b", t_text) is not None) or (re.search(r"\bguards?\b", t_text) is not None)
+        to_moat  = _MOAT_RE.search(t_text) is not None
+        to_grass = (_GRASS_RE.search(t_text) is not None) or (_GUARDS_RE.search(t_text) is not None)
         # om varken moat eller grass nämns: defaulta till grass när man står uppe; annars plattform
         default_to_grass_from_top = True
 
@@ -1824,41 +2278,41 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 if state.current_room == "courtyard_01" and at_top:
                     if to_moat:
                         keys["location"] = "courtyard_moat"  # oåterfinnliga
-                        state.items["keys"] = keys
+                        _store_item(state, "keys", keys)
                         llm.narration = "You hurl the keys into the moat; they splash and sink."
                     elif to_grass or default_to_grass_from_top:
                         keys["location"] = "courtyard_01"     # nere på gräset
-                        state.items["keys"] = keys
+                        _store_item(state, "keys", keys)
                         llm.narration = "You pitch the keys down to the grass below."
                     else:
                         # skulle inte inträffa pga default_to_grass_from_top, men som fallback: lägg kvar på plattformen
                         keys["location"] = "courtyard_tower_top"
-                        state.items["keys"] = keys
-                    _recalc_slot()
+                        _store_item(state, "keys", keys)
+                    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                 else:
                     # Not on the tower: courtyard grass cannot clear the wall into the moat
                     if state.current_room == "courtyard_01":
                         if to_moat:
                             keys["location"] = "courtyard_01"
-                            state.items["keys"] = keys
-                            _recalc_slot()
+                            _store_item(state, "keys", keys)
+                            holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                             llm.narration = "It's not possible to throw over the wall; it lands on the grass."
                         else:
                             keys["location"] = state.current_room
-                            state.items["keys"] = keys
-                            _recalc_slot()
+                            _store_item(state, "keys", keys)
+                            holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                             if not llm.narration:
                                 llm.narration = "The keys clatter on the grass."
                     else:
                         # Other rooms: throwing behaves like dropping in-place
                         keys["location"] = state.current_room
-                        state.items["keys"] = keys
-                        _recalc_slot()
+                        _store_item(state, "keys", keys)
+                        holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                         if not llm.narration:
                             llm.narration = "The keys clatter to the floor."
             else:
                 notes.append("Tried to throw keys while not holding them; ignored.")
-                llm.narration = "You aren't holding any keys. Nothing special happened."
+                llm.narration = _nothing("You aren't holding any keys.")
             # ta bort eventet så vi inte dubbelprocessar
             
 
@@ -1868,45 +2322,45 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 if state.current_room == "courtyard_01":
                     if in_moat:
                         notes.append("Denied throwing crossbow while in moat.")
-                        llm.narration = "You flail in the cold water and think better of it. Nothing special happened."
+                        llm.narration = _nothing("You flail in the cold water and think better of it.")
                     elif at_top:
                         if to_moat:
                             crossbow["location"] = "courtyard_moat"  # oåterfinnlig (samma som drop->moat)
-                            state.items["crossbow"] = crossbow
+                            _store_item(state, "crossbow", crossbow)
                             llm.narration = "You hurl the crossbow into the moat; it splashes and sinks."
                         elif to_grass or default_to_grass_from_top:
                             crossbow["location"] = "courtyard_01"     # nere på gräset
-                            state.items["crossbow"] = crossbow
+                            _store_item(state, "crossbow", crossbow)
                             llm.narration = "You pitch the crossbow down to the grass below."
                         else:
                             # fallback: lägg kvar på plattformen
                             crossbow["location"] = "courtyard_tower_top"
-                            state.items["crossbow"] = crossbow
-                        _recalc_slot()
+                            _store_item(state, "crossbow", crossbow)
+                        holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                     else:
                         # On the grass: can't throw over the wall into the moat
                         if to_moat and state.current_room == "courtyard_01":
                             crossbow["location"] = "courtyard_01"
-                            state.items["crossbow"] = crossbow
-                            _recalc_slot()
+                            _store_item(state, "crossbow", crossbow)
+                            holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                             llm.narration = "It's not possible to throw over the wall; it lands on the grass."
                         else:
                             crossbow["location"] = state.current_room
-                            state.items["crossbow"] = crossbow
-                            _recalc_slot()
+                            _store_item(state, "crossbow", crossbow)
+                            holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                             if not llm.narration:
                                 llm.narration = "The crossbow thumps onto the ground."
 
                 else:
                     # andra rum: bete dig som vanligt drop i rummet
                     crossbow["location"] = state.current_room
-                    state.items["crossbow"] = crossbow
-                    _recalc_slot()
+                    _store_item(state, "crossbow", crossbow)
+                    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                     if not llm.narration:
                         llm.narration = "The crossbow lands with a dull thunk."
             else:
                 notes.append("Tried to throw crossbow while not holding it; ignored.")
-                llm.narration = "You aren't holding the crossbow. Nothing special happened."
+                llm.narration = _nothing("You aren't holding the crossbow.")
             
 
 
@@ -1914,38 +2368,38 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
     if "extinguish_torch" in events:
         if holding_torch and torch.get("lit"):
             torch["lit"] = False
-            state.items["torch"] = torch
+            _store_item(state, "torch", torch)
             notes.append("Torch extinguished while held.")
             llm.narration = "You cup the flame and snuff it out."
         elif torch.get("location") == state.current_room and torch.get("lit"):
             torch["lit"] = False
-            state.items["torch"] = torch
+            _store_item(state, "torch", torch)
             notes.append("Torch extinguished on the ground in this room.")
             llm.narration = "You snuff the torch; darkness creeps back."
         else:
             notes.append("No lit torch to extinguish; ignoring.")
-            llm.narration = "There’s no lit torch you want to extinguish. Nothing special happened."
+            llm.narration = _nothing("There’s no lit torch you want to extinguish.")
 
     if "drop_torch" in events:
         if holding_torch:
             torch["location"] = state.current_room
-            state.items["torch"] = torch
+            _store_item(state, "torch", torch)
         else:
             notes.append("Tried to drop torch while not holding it; ignored.")
 
     if "drop_keys" in events:
         if holding_keys:
             keys["location"] = state.current_room
-            state.items["keys"] = keys
+            _store_item(state, "keys", keys)
         else:
             notes.append("Tried to drop keys while not holding them; ignored.")
 
     if "drop_crossbow" in events:
         if holding_crossbow:
             t_text = (player_action_text or "").lower()
-            to_moat   = re.search(r"\bmoat\b", t_text) is not None
-            to_grass  = re.search(r"\b(grass|lawn|ground|down)\b", t_text) is not None
-            to_plat   = re.search(r"\b(platform|here|floor|at\s+my\s+feet)\b", t_text) is not None
+            to_moat   = _MOAT_RE.search(t_text) is not None
+            to_grass  = _GRASS_RE.search(t_text) is not None
+            to_plat   = _PLATFORM_SPOT_RE.search(t_text) is not None
 
             in_moat = state.current_room == "courtyard_01" and state.flags_courtyard.get("in_moat", False)
             at_top  = state.current_room == "courtyard_01" and state.flags_courtyard.get("at_tower_top", False)
@@ -1954,95 +2408,89 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 if in_moat:
                     # I vallgraven: varna och hindra (annars sjunker vapnet och blir borta utan val)
                     notes.append("Denied dropping crossbow in moat while player is in moat.")
-                    llm.narration = "If you drop it here, it sinks into the moat. You hold on. Nothing special happened."
+                    llm.narration = _nothing("If you drop it here, it sinks into the moat. You hold on.")
                     events = [e for e in events if e != "drop_crossbow"]
                 elif at_top:
                     if to_moat:
                         crossbow["location"] = "courtyard_moat"
-                        state.items["crossbow"] = crossbow
+                        _store_item(state, "crossbow", crossbow)
                         llm.narration = "You hurl the crossbow into the moat; it splashes and sinks."
                     elif to_grass:
                         crossbow["location"] = "courtyard_01"  # gräset nedanför
-                        state.items["crossbow"] = crossbow
+                        _store_item(state, "crossbow", crossbow)
                         llm.narration = "You pitch the crossbow down to the grass below."
                     else:
                         # default från plattformen om mål saknas ⇒ lägg kvar på plattformen
                         crossbow["location"] = "courtyard_tower_top"
-                        state.items["crossbow"] = crossbow
+                        _store_item(state, "crossbow", crossbow)
                 else:
                     # På gräset: droppa på marken här
                     crossbow["location"] = state.current_room
-                    state.items["crossbow"] = crossbow
+                    _store_item(state, "crossbow", crossbow)
             else:
                 # Alla andra rum: vanligt drop i rummet
                 crossbow["location"] = state.current_room
-                state.items["crossbow"] = crossbow
+                _store_item(state, "crossbow", crossbow)
         else:
             notes.append("Tried to drop crossbow while not holding it; ignored.")
 
 
     # Recompute slot occupancy after drops
-    holding_torch = (state.items.get("torch", {}).get("location") == "player")
-    holding_keys  = (state.items.get("keys", {}).get("location") == "player")
-    holding_crossbow = (state.items.get("crossbow", {}).get("location") == "player")
-    slot_occupied = holding_torch or holding_keys or holding_crossbow
-
-        # Recompute slot occupancy after drops
-    _recalc_slot()
+    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
 
 
     # 2) Process PICKUPS after drops
-    if ("pickup_stick" in events) or ("pickup_torch" in events) or ("has_torch_stick" in llm.flags_set):
+    if ("pickup_stick" in events) or ("pickup_torch" in events) or ("has_torch_stick" in llm_flags):
         if holding_torch:
             notes.append("Already holding the torch; pickup ignored.")
         elif slot_occupied:
             notes.append("Hands full; cannot pick up torch while holding another item.")
-            llm.narration = "Your hands are full. Drop what you're holding first. Nothing special happened."
+            llm.narration = _nothing("Your hands are full. Drop what you're holding first.")
         else:
             if torch["location"] == state.current_room:
                 torch["location"] = "player"
-                state.items["torch"] = torch
+                _store_item(state, "torch", torch)
                 new_flags.append("has_torch_stick")
-                _recalc_slot()
+                holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
             else:
                 if state.current_room == "cell_01":
                     # Spelaren försöker ta väggfacklan i cellen (den är fastsatt)
                     notes.append("Tried to take the fixed wall torch in the cell; denied.")
-                    llm.narration = "The wall torch is fixed in its bracket, and there isn’t a loose torch here. Nothing special happened."
+                    llm.narration = _nothing("The wall torch is fixed in its bracket, and there isn’t a loose torch here.")
                 else:
                     notes.append("Torch is not in this room; pickup ignored.")
-                    llm.narration = "You feel around, but there’s no torch here. Nothing special happened."
+                    llm.narration = _nothing("You feel around, but there’s no torch here.")
 
     if "pickup_keys" in events:
         if holding_keys:
             notes.append("Already holding the keys; pickup ignored.")
         elif slot_occupied:
             notes.append("Hands full; cannot pick up keys while holding another item.")
-            llm.narration = "Your hands are full. Drop what you're holding first. Nothing special happened."
+            llm.narration = _nothing("Your hands are full. Drop what you're holding first.")
         else:
             if state.current_room == "courtyard_01":
                 at_top = state.flags_courtyard.get("at_tower_top", False)
                 if keys["location"] == "courtyard_moat":
-                    llm.narration = "You can't reach them — the keys sank into the moat. Nothing special happened."
+                    llm.narration = _nothing("You can't reach them — the keys sank into the moat.")
                     events = [e for e in events if e != "pickup_keys"]
                 elif at_top and keys["location"] == "courtyard_01":
-                    llm.narration = "The keys are down on the grass. Climb down first. Nothing special happened."
+                    llm.narration = _nothing("The keys are down on the grass. Climb down first.")
                     events = [e for e in events if e != "pickup_keys"]
                 elif keys["location"] in ("courtyard_tower_top", state.current_room):
                     keys["location"] = "player"
-                    state.items["keys"] = keys
-                    _recalc_slot()
+                    _store_item(state, "keys", keys)
+                    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                 else:
                     notes.append("Keys are not in this room; pickup ignored.")
-                    llm.narration = "You don't find any keys here. Nothing special happened."
+                    llm.narration = _nothing("You don't find any keys here.")
             else:
                 if keys["location"] == state.current_room:
                     keys["location"] = "player"
-                    state.items["keys"] = keys
-                    _recalc_slot()
+                    _store_item(state, "keys", keys)
+                    holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
                 else:
                     notes.append("Keys are not in this room; pickup ignored.")
-                    llm.narration = "You don't find any keys here. Nothing special happened."
+                    llm.narration = _nothing("You don't find any keys here.")
 
 
     if "pickup_crossbow" in events:
@@ -2050,62 +2498,65 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             notes.append("Already holding the crossbow; pickup ignored.")
         elif slot_occupied:
             notes.append("Hands full; cannot pick up the crossbow while holding another item.")
-            llm.narration = "Your hands are full. Drop what you're holding first. Nothing special happened."
+            llm.narration = _nothing("Your hands are full. Drop what you're holding first.")
         else:
             in_moat = state.flags_courtyard.get("in_moat", False)
             at_top = state.flags_courtyard.get("at_tower_top", False)
 
             if state.current_room == "courtyard_01" and crossbow.get("location") == "courtyard_moat":
                 notes.append("Crossbow is in the moat; cannot pick up.")
-                llm.narration = "You can't reach it—the crossbow sank into the moat. Nothing special happened."
+                llm.narration = _nothing("You can't reach it—the crossbow sank into the moat.")
                 # avbryt pickup den här turen
                 events = [e for e in events if e != "pickup_crossbow"]
                 # lämna slot/locations oförändrade
 
             if state.current_room == "courtyard_01" and in_moat:
                 notes.append("Crossbow pickup attempted from the moat; denied.")
-                llm.narration = "The crossbow is out of reach from the water. Get onto the grass or the platform first. Nothing special happened."
+                llm.narration = _nothing("The crossbow is out of reach from the water. Get onto the grass or the platform first.")
             elif state.current_room == "courtyard_01" and at_top and crossbow["location"] == "courtyard_tower_top":
                 crossbow["location"] = "player"
-                state.items["crossbow"] = crossbow
-                _recalc_slot()
+                _store_item(state, "crossbow", crossbow)
+                holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
             elif state.current_room == "courtyard_01" and (not at_top) and (not in_moat) and crossbow["location"] == "courtyard_01":
                 crossbow["location"] = "player"
-                state.items["crossbow"] = crossbow
-                _recalc_slot()
+                _store_item(state, "crossbow", crossbow)
+                holding_torch, holding_keys, holding_crossbow, slot_occupied = _hand_slots(state.items)
             else:
                 notes.append("Crossbow not reachable here; you need to be at the same elevation.")
-                llm.narration = "You reach out, but the crossbow is not within reach here. Nothing special happened."
+                llm.narration = _nothing("You reach out, but the crossbow is not within reach here.")
 
 
     # 3) Lighting attempts (only in the cell and only if holding an unlit torch)
     if "light_torch" in events:
-        holding_torch_now = (state.items["torch"]["location"] == "player")
+        holding_torch_now = (torch.get("location") == "player")
         if state.current_room != "cell_01":
             notes.append("Ignored 'light_torch' outside Prison Cell.")
             events = [e for e in events if e != "light_torch"]
-            if "torch_lit" in llm.flags_set:
+            if "torch_lit" in llm_flags:
+                llm_flags.discard("torch_lit")
                 llm.flags_set = [f for f in llm.flags_set if f != "torch_lit"]
             if not holding_torch_now:
-                _set_narr("You’re not holding the torch, and you can only light it on the wall torch in the prison cell. Nothing special happened.")
+                _set_narr(_nothing("You’re not holding the torch, and you can only light it on the wall torch in the prison cell."))
             else:
-                _set_narr("You can only light the torch on the wall torch in the prison cell. Nothing special happened.")
+                _set_narr(_nothing("You can only light the torch on the wall torch in the prison cell."))
         elif not holding_torch_now:
             notes.append("Ignored 'light_torch' without holding the torch.")
             events = [e for e in events if e != "light_torch"]
-            _set_narr("You lean toward the wall flame with empty hands; heat licks your knuckles and you flinch back. Nothing special happened.")
+            _set_narr(_nothing("You lean toward the wall flame with empty hands; heat licks your knuckles and you flinch back."))
 
             
-        elif state.items["torch"].get("lit"):
+        elif torch.get("lit"):
             notes.append("Torch already lit; ignoring duplicate.")
         else:
-            state.items["torch"]["lit"] = True
+            torch["lit"] = True
+            _store_item(state, "torch", torch)
             notes.append("Torch lit.")
             new_flags.append("torch_lit")
             llm.narration = "You touch the stick to the wall flame; the torch flares to life."
 
     # Keep flags in sync with items for LLM context and engine logic
-    sync_flags_with_items(state)
+    if (torch.get("location"), torch.get("lit"), "torch" in state.items) != torch_before:
+        sync_flags_with_items(state)
 
     prog_norm = (llm.progression or "").strip().lower()
 
@@ -2114,7 +2565,7 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         wants_go = (
             ("enter_coal_cellar" in events)
             or (prog_norm in {"next_room", "coal_01", "coal", "coal_cellar"})
-            or ("entered_hole" in llm.flags_set)
+            or ("entered_hole" in llm_flags)
         )
         # NYTT: endast tillåt traversal om spelarens INPUT uttryckte rörelse in i hålet
         input_move_intent = (infer_move_event("cell_01", player_action_text) == "enter_coal_cellar")
@@ -2123,13 +2574,10 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             room_transition = "coal_01"
         elif wants_go and not input_move_intent:
             # Icke-rörelseinteraktioner med hålet ska inte traversera
-            llm.narration = "You peer into the tight opening; coal dust rasps at your nose. You’d have to crawl to go anywhere. Nothing special happened."
+            llm.narration = _nothing("You peer into the tight opening; coal dust rasps at your nose. You’d have to crawl to go anywhere.")
         elif wants_go and not can_go:
-            narration_tmp = (llm.narration.strip() if llm.narration else "")
-            if narration_tmp and narration_tmp[-1] not in ".!?":
-                narration_tmp += "."
-            denial_line = " The stone still blocks the opening; you can’t squeeze through."
-            llm.narration = (narration_tmp + denial_line).strip()
+            llm.narration = _append_sentence((llm.narration or "").strip(),
+                                             "The stone still blocks the opening; you can’t squeeze through.")
             notes.append("Attempted to enter coal cellar but stone not moved; movement denied.")
 
 
@@ -2148,12 +2596,12 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             if inferred != "open_hall_door":
                 notes.append("Blocked open_hall_door due to missing explicit input intent.")
                 events = [e for e in events if e != "open_hall_door"]
-                llm.narration = "Your hand pauses on cold stone—first decide if you’re actually opening the door. Nothing special happened."
+                llm.narration = _nothing("Your hand pauses on cold stone—first decide if you’re actually opening the door.")
             elif torch_light_present_here(state):  # tillåter även tänd fackla nedlagd i rummet
                 room_transition = "hall_01"
             else:
                 notes.append("Ignored 'open_hall_door' without light present in this room.")
-                llm.narration = "You grope toward the far door, but in pitch-black you can't find the handle. Better find light first. Nothing special happened."
+                llm.narration = _nothing("You grope toward the far door, but in pitch-black you can't find the handle. Better find light first.")
 
 
 
@@ -2164,10 +2612,11 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         notes.append(f"HP changed {prev_hp} -> {state.hp} (delta {enforced_hp_delta}).")
 
     # ---------------- Narration & cues (initial composition) ----------------
-    narration = llm.narration.strip() or "Nothing happens. The scene remains as it was. Nothing special happened."
+    narration = llm.narration.strip() or _nothing("Nothing happens. The scene remains as it was.")
+    # Gemener en gång; uppdateras varje gång narration skrivs om nedan
+    nl = narration.lower()
 
     if state.current_room == "cell_01":
-        nl = narration.lower()
         cues: List[str] = []
 
         # hinta baserat på state-delta (inte new_flags)
@@ -2186,10 +2635,9 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             cues.append("Your torch catches fire and burns steadily.")
 
         if cues:
-            narration = _re.sub(r'\s*Nothing special happened\.\s*$', '', narration).strip()
-            if narration and narration[-1] not in ".!?":
-                narration += "."
-            narration += " " + " ".join(cues)
+            narration = _NOTHING_SPECIAL_TAIL_RE.sub("", narration).strip()
+            narration = _append_sentence(narration, " ".join(cues))
+            nl = narration.lower()
 
         # deterministisk, tydlig rad första gången stenen verkligen lyfts
         if (not was_stone_moved_before) and state.flags_cell.get("stone_moved", False):
@@ -2197,30 +2645,29 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 narration = "You brush the straw aside and spot a loose stone. You carefully lift it aside, revealing a crawlable hole."
             else:
                 narration = "You carefully lift the loose cobblestone aside, revealing a crawlable hole."
+            nl = narration.lower()
     # Om stenen redan var åt sidan före turen och spelaren försöker igen:
     if state.current_room == "cell_01" and was_stone_moved_before and attempted_move_stone_input and not room_transition:
-        narration = _re.sub(r'\s*Nothing special happened\.\s*$', '', narration).strip()
+        narration = _NOTHING_SPECIAL_TAIL_RE.sub("", narration).strip()
         narration = "The loose stone is already aside."
+        nl = narration.lower()
 
     if state.current_room == "coal_01":
-        nl = narration.lower()
         cues: List[str] = []
-        if "has_torch_stick" in new_flags and ("wooden torch" not in nl and "torch stick" not in nl and "torch" not in nl):
+        if "has_torch_stick" in new_flags and "torch" not in nl:
             cues.append("You pick up a wooden torch.")
         if cues:
-            if narration and narration[-1] not in ".!?":
-                narration += "."
-            narration += " " + " ".join(cues)
+            narration = _append_sentence(narration, " ".join(cues))
+            nl = narration.lower()
 
     # Ensure guard strike narration line if needed (cell) — no duplicates
     if enforced_hp_delta == -20 and state.current_room == "cell_01":
-        nl2 = narration.lower()
-        has_guard = ("guard" in nl2)
-        has_hit_verb = HIT_VERBS_RE.search(nl2) is not None
+        has_guard = ("guard" in nl)
+        has_hit_verb = (has_guard and any(t in nl for t in _HIT_VERB_HINTS)
+                        and HIT_VERBS_RE.search(nl) is not None)
         if not (has_guard and has_hit_verb):
-            if narration and narration[-1] not in ".!?":
-                narration += "."
-            narration += " The guard gets annoyed and unlocks the door, strikes you with his fist, locks the door, and then returns to his bench."
+            narration = _append_sentence(narration, "The guard gets annoyed and unlocks the door, strikes you with his fist, locks the door, and then returns to his bench.")
+            nl = narration.lower()
 
 
     # Guard-scrub i alla rum utom cell_01
@@ -2230,37 +2677,32 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
 
     # Knight-scrub i rum där riddaren inte finns (cell_01 & coal_01)
     if state.current_room in {"cell_01", "coal_01"}:
-        knight_mentioned = ("knight_notice" in events) or ("combat_knock_guard" in events) or _re.search(r"\bknight\b", narration, _re.IGNORECASE)
+        # Substring-förfilter; ordgränsen kontrolleras bara om "knight" alls förekommer
+        knight_events = not _KNIGHT_COMBAT_EVENTS.isdisjoint(events)
+        knight_mentioned = knight_events or ("knight" in nl and _KNIGHT_RE.search(narration))
         if knight_mentioned:
-            events = [e for e in events if e not in {"knight_notice", "combat_knock_guard"}]
-            other_meaningful = any(e in {
-                "straw_rummaged","stone_lifted","enter_coal_cellar","return_to_cell","open_hall_door",
-                "pickup_stick","pickup_torch","drop_torch","extinguish_torch","light_torch",
-                "drop_keys","pickup_keys",
-                "dark_stumble"
-            } for e in events)
+            if knight_events:
+                events = [e for e in events if e not in _KNIGHT_COMBAT_EVENTS]
+            other_meaningful = not _KNIGHT_SCRUB_OTHER_EVENTS.isdisjoint(events)
             if not (state.current_room == "cell_01" and enforced_hp_delta == -20):
                 if other_meaningful:
-                    if narration and narration[-1] not in ".!?":
-                        narration += "."
-                    narration += " There’s no knight here."
+                    narration = _append_sentence(narration, "There’s no knight here.")
                 else:
-                    narration = "There’s no knight here. Nothing special happened."
+                    narration = _nothing("There’s no knight here.")
+                nl = narration.lower()
             notes.append("Removed knight-related narration/events outside the hall.")
 
     # ---------------- Darkness-specific narrative guards ----------------
     # Deny "using the torch" if not carried/present lit here.
-    if state.current_room == "coal_01" and USE_TORCH_RE.search(player_action_text or ""):
-        if not (state.items.get("torch", {}).get("location") == "player") and not torch_light_present_here(state):
-            if narration and narration[-1] not in ".!?":
-                narration += "."
-            narration += " You don't have a torch here."
+    if state.current_room == "coal_01" and _USE_TORCH_RE.search(player_action_text or ""):
+        if not (torch.get("location") == "player") and not torch_light_present_here(state):
+            narration = _append_sentence(narration, "You don't have a torch here.")
+            nl = narration.lower()
 
     # Darkness "look" hint (adds a brief safety nudge).
-    if state.current_room == "coal_01" and dark_here and LOOK_RE.search(player_action_text or ""):
-        if narration and narration[-1] not in ".!?":
-            narration += "."
-        narration += " Better not move while in darkness—find some light first."
+    if state.current_room == "coal_01" and dark_here and _LOOK_RE.search(player_action_text or ""):
+        narration = _append_sentence(narration, "Better not move while in darkness—find some light first.")
+        nl = narration.lower()
 
     # Hard darkness clamp — om LLM påstår ljus/detaljer i beckmörker, ersätt men bevara pickups
     if state.current_room == "coal_01" and dark_here and "return_to_cell" not in events and "open_hall_door" not in events:
@@ -2273,15 +2715,16 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
                 narration = "You pick up a wooden torch. It is pitch-black. Better not move while in darkness—find some light first."
             else:
                 narration = "It is pitch-black. Better not move while in darkness—find some light first."
+            nl = narration.lower()
             notes.append("Replaced narration due to light/seeing claims while in total darkness (pickup preserved if present).")
 
 
         # Hard light clamp — om fackelljus finns HÄR, men LLM påstår mörker/snubbel, korrigera texten.
     if state.current_room == "coal_01" and torch_light_present_here(state):
-        if re.search(r"\b(pitch[- ]?black|total\s+dark(ness)?|can't\s+see|cannot\s+see|blindly|grope|stumble)\b",
-                    narration, re.IGNORECASE):
+        if any(t in nl for t in _DARKNESS_CLAIM_HINTS) and _DARKNESS_CLAIM_RE.search(narration):
             narration = ("With the light from your torch, the cramped coal heaps come into view; "
                         "at the far end a short staircase leads to a closed door.")
+            nl = narration.lower()
             notes.append("Replaced contradictory darkness narration because torchlight is present in coal_01.")
 
 
@@ -2291,17 +2734,11 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         dst = room_transition
 
         # Sätt deterministisk färd-narration
-        canonical_move_lines = {
-            ("cell_01", "coal_01"): "You carefully crawl into the hole and drop into the coal cellar.",
-            ("coal_01", "cell_01"): "You climb back up through the crawl opening into the prison cell.",
-            ("coal_01", "hall_01"): "You push the far door open and step into the great hall.",
-            ("hall_01", "coal_01"): "You slip back through the door into the coal cellar.",
-            ("hall_01", "courtyard_01"): "You pull the door open and step into the castle courtyard.",
-        }
-        move_line = canonical_move_lines.get((src, dst))
+        move_line = _CANONICAL_MOVE_LINES.get((src, dst))
         if move_line:
             llm.narration = move_line
             narration = move_line
+            nl = narration.lower()
 
         notes.append(f"Room transition: {src} -> {dst}")
         state.current_room = dst
@@ -2309,44 +2746,26 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
         sync_flags_with_items(state)
 
     # ---------------- Inventory UI ----------------
-    state.inventory = inventory_items_from_items(state)
+    refresh_inventory(state)
 
     # ---------------- Final sanity: if nothing meaningful happened, enforce "Nothing special happened."
-    meaningful_events = {
-        "drop_torch", "pickup_torch", "pickup_stick", "light_torch", "extinguish_torch",
-        "drop_keys", "pickup_keys", "unlock_courtyard_door",
-        "drop_crossbow", "pickup_crossbow", "shoot_guard",
-        "dark_stumble", "guard_punishes",
-        "enter_coal_cellar", "return_to_cell", "return_to_coal", "open_hall_door",
-        "straw_rummaged", "stone_lifted",
-        "knight_notice", "combat_knock_guard",
-        "climb_ladder_up", "climb_ladder_down", "pull_lever", "guards_arrive",
-        "cross_gate_bridge", "jump_into_moat", "swim_across",
-        "throw_keys", "throw_crossbow",
-
-    }
 
     something_happened = (
         bool(room_transition) or
         bool(game_won) or
         (state.hp != prev_hp) or
-        any(e in events for e in meaningful_events)
+        not _MEANINGFUL_EVENTS.isdisjoint(events)
     )
 
     # Om ingen transition skedde men narrationen hävdar att du "är i" ett annat rum: klampa
     if not room_transition:
-        claim_hall = _re.search(r"\b(Great Hall)\b", narration, _re.IGNORECASE)
-        claim_coal = _re.search(r"\b(Coal Cellar)\b", narration, _re.IGNORECASE)
-        claim_cell = _re.search(r"\b(Prison Cell)\b", narration, _re.IGNORECASE)
-        claimed = None
-        if claim_hall:
-            claimed = "hall_01"
-        elif claim_coal:
-            claimed = "coal_01"
-        elif claim_cell:
-            claimed = "cell_01"
-        if claimed and claimed != state.current_room:
-            narration = "You stay where you are. Nothing special happened."
+        if any(t in nl for t in _ROOM_CLAIM_HINTS):
+            # En genomläsning; vid flera rumsnamn gäller hall > coal > cell
+            claims = {m.lastgroup for m in _ROOM_CLAIM_RE.finditer(narration)}
+            claimed = next((r for r in _ROOM_CLAIM_PRIORITY if r in claims), None)
+            if claimed and claimed != state.current_room:
+                narration = _nothing("You stay where you are.")
+                nl = narration.lower()
 
         # Sub-location clamp: tower top claims när man står på gräset
         if (
@@ -2358,31 +2777,28 @@ def validate_and_apply(state: GameState, llm: LLMResult, player_action_text: str
             and "climb_ladder_down" not in events
             and "pull_lever" not in events
         ):
-            if re.search(r"\b(platform|tower\s+top|top\s+of\s+the\s+tower)\b", narration, re.IGNORECASE):
-                narration = "You are on the grass below the tower. Nothing special happened."
+            if any(t in nl for t in _TOWER_TOP_CLAIM_HINTS) and _TOWER_TOP_CLAIM_RE.search(narration):
+                narration = _nothing("You are on the grass below the tower.")
 
     # Suppress "Nothing special happened." on pure LOOK/describe turns
     look_only = (not something_happened) and (
-        LOOK_RE.search(player_action_text or "") is not None
-        or SEE_QUERY_RE.search(player_action_text or "") is not None
-        or ADVICE_QUERY_RE.search(player_action_text or "") is not None
+        _LOOK_RE.search(player_action_text or "") is not None
+        or _SEE_QUERY_RE.search(player_action_text or "") is not None
+        or _ADVICE_QUERY_RE.search(player_action_text or "") is not None
     )
 
     # If something meaningful happened but earlier narration injected "Nothing special happened.", strip it
     if something_happened:
-        narration = _re.sub(r'\s*Nothing (?:special )?happened\.\s*$', '', narration).strip()
-        narration = _re.sub(r'(?<!\S)Nothing (?:special )?happened\.(?:\s+)?', '', narration).strip()
+        narration = _NOTHING_ANY_RE.sub("", narration).strip()
 
     if not something_happened and not look_only:
         if scrubbed_illegal_events:
-            narration = "You stay where you are. Nothing special happened."
+            narration = _nothing("You stay where you are.")
         elif not crossbow_nohold:
-            if narration and narration[-1] not in ".!?":
+            if NOTHING_LINE not in narration:
+                narration = _append_sentence(narration, NOTHING_LINE)
+            elif not narration.endswith(_SENTENCE_END):
                 narration += "."
-            if "Nothing special happened." not in narration:
-                narration += " Nothing special happened."
-                    # Normalize boring-outcome wording globally
-                narration = narration.replace("Nothing special happened.", NOTHING_LINE)
 
         # else: crossbow_nohold => exakt fras, ingen "Nothing special happened."
 
@@ -2418,21 +2834,21 @@ WELCOME_TEXT = (
     "Notes:\n"
     "- Only one item in your inventory at once.\n"
     "- It's better if you specify your prompt. Type 'Pick up the flower, instead of 'Pick it up'.\n"
-    "- Limit yourself to one action per prompt.\n"
+    "- One action per turn; in the terminal you can chain turns with ';' (e.g. 'search the straw; lift the stone').\n"
     "- The engine should handle certain misspelling, but try to spell correctly.\n"
     "- If the LLM hallucinates a narration that ends in 'Nothing special happened', you are most likely in the same state as before." 
 )
 
 def print_status(hp: int, noise_level: int, hp_delta: int, inventory: List[str], cause: str = "") -> None:
     if hp_delta != 0 and cause:
-        print(f"[HP {hp} ({hp_delta}) — {cause}]")
+        hp_line = f"[HP {hp} ({hp_delta}) — {cause}]"
     elif hp_delta != 0:
-        print(f"[HP {hp} ({hp_delta})]")
+        hp_line = f"[HP {hp} ({hp_delta})]"
     else:
-        print(f"[HP {hp}]")
-    print(f"[Noise this turn: {noise_level}]")
+        hp_line = f"[HP {hp}]"
     inv_text = ", ".join(inventory) if inventory else "empty"
-    print(f"[Inventory: {inv_text}]")
+    # En enda write i stället för tre
+    print(f"{hp_line}\n[Noise this turn: {noise_level}]\n[Inventory: {inv_text}]")
 
 
 def game_over_line() -> str:
@@ -2464,6 +2880,40 @@ def print_coal_lit_entry_hint_if_applicable(state: GameState) -> None:
         print("Torchlight pushes back the darkness: heaps of coal crowd the tight stone floor, and at the far end a short staircase leads down to a closed door.\n")
 
 
+# Lokala kommandon som besvaras utan LLM-anrop (matchas mot hela, gemener-inmatningen)
+_INVENTORY_CMD_RE = re.compile(r"(?:i|inv|inventory|check (?:my )?inventory|show (?:my )?inventory)[.!]?")
+_HELP_CMD_RE = re.compile(r"(?:help|\?|commands)[.!]?")
+_QUIT_CMD_RE = re.compile(r"(?:quit|exit)[.!]?")
+# Rena förflyttningar som motorn kan avgöra själv (se try_deterministic_move)
+_PLAIN_MOVE_MAX_WORDS = 8
+_COMPOUND_ACTION_RE = re.compile(r"\b(?:and|then|while|but|quietly|loudly)\b|[,;]")
+
+
+def try_deterministic_move(state: GameState, player_action: str) -> Optional[Tuple[GameState, Dict[str, Any]]]:
+    """
+    Plain movement input ("crawl into the hole", "go back to the cell") is committed by the
+    engine with a canonical move line, so the model's narration would be discarded anyway.
+    Apply it to a copy of the state with a synthetic reply; return (new_state, result) if the
+    engine commits a clean transition, else None (the caller asks the LLM as usual).
+    """
+    t = player_action.lower().rstrip(".!")
+    if len(t.split()) > _PLAIN_MOVE_MAX_WORDS or _COMPOUND_ACTION_RE.search(t) or infer_item_events(t):
+        return None
+    event = infer_move_event(state.current_room, t)
+    if event is None:
+        return None
+    shadow = copy.deepcopy(state)
+    result = validate_and_apply(shadow, LLMResult("", 0, 0, [event], [], "", ""), player_action)
+    if (not result.get("room_transition") or result.get("game_won")
+            or result["applied_hp_delta"] or result["applied_noise"]):
+        return None
+    return shadow, result
+
+
+# Dödsrad redan berättad? Annars lägger main till en egen
+_DEATH_RE = re.compile(r"\b(?:die|dies|dead|death|lifeless|darkness takes you|your last breath)\b", re.IGNORECASE)
+
+
 def main() -> None:
     dev_log("PROMPT_VERSION: 3.3 (... )")
 
@@ -2474,85 +2924,83 @@ def main() -> None:
 
     state = GameState()
     client = OllamaChat()
+    # Ladda modellen (och cellens promptprefix) i bakgrunden medan spelaren läser introt
+    threading.Thread(target=client.warm_up, args=(build_system_prompt(state.current_room),), daemon=True).start()
+    # "a; b; c" körs som flera turer i följd (en LLM-tur per handling)
+    pending: Deque[str] = deque()
+    echo_actions = False
 
     while True:
-        try:
-            player_action = input("> ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\nExiting. Goodbye.")
-            return
-
-        if not player_action:
-            print("(Say what you do.)")
-            continue
-
-        if player_action.lower() in {"inventory", "inv"}:
-            state.inventory = inventory_items_from_items(state)
+        if not pending:
+            try:
+                line = input("> ")
+            except (EOFError, KeyboardInterrupt):
+                print("\nExiting. Goodbye.")
+                return
+            # Normalisera blanksteg: samma handling ger samma prompt (och träff i svarscachen)
+            parts = (" ".join(part.split()) for part in line.split(";"))
+            pending.extend(part for part in parts if part)
+            echo_actions = len(pending) > 1
+            if not pending:
+                print("(Say what you do.)")
+                continue
+
+        player_action = pending.popleft()
+        if echo_actions:
+            print(f"> {player_action}")
+
+        command = player_action.lower()
+        if _INVENTORY_CMD_RE.fullmatch(command):
+            refresh_inventory(state)
             print_status(state.hp, noise_level=0, hp_delta=0, inventory=state.inventory, cause="")
             continue
 
-        if player_action.lower() in {"help", "?"}:
-            print("Commands: type what you do in plain English. Useful: 'inventory', 'quit'. Keep quiet in the cell.")
+        if _HELP_CMD_RE.fullmatch(command):
+            print("Commands: type what you do in plain English (separate several actions with ';'). Useful: 'inventory', 'quit'. Keep quiet in the cell.")
             continue
 
-        if player_action.lower() in {"quit", "exit"}:
+        if _QUIT_CMD_RE.fullmatch(command):
             print("You give up. The castle remains your world.")
             print(game_over_line())
             return
 
-        # Build scene card for the current room
-        scene_card = SCENES[state.current_room]
-        scene_json = json.dumps(scene_card, ensure_ascii=False, indent=2)
-        sync_flags_with_items(state)
-
-        flags_cell_str = json.dumps(state.flags_cell, ensure_ascii=False)
-        # Sync flags with items before sending to model (for accurate context)
-        
-        flags_coal_str = json.dumps(state.flags_coal, ensure_ascii=False)
-        items_str = json.dumps(state.items, ensure_ascii=False)
-        inventory_str = json.dumps(state.inventory, ensure_ascii=False)
-        flags_hall_str = json.dumps(state.flags_hall, ensure_ascii=False)
-        flags_courtyard_str = json.dumps(state.flags_courtyard, ensure_ascii=False)
-
-        user_prompt = USER_INSTRUCTION_TEMPLATE.format(
-            room_id=state.current_room,
-            room_title=scene_card.get("title", state.current_room),
-            scene_card_json=scene_json,
-            hp=state.hp,
-            flags_cell=flags_cell_str,
-            flags_coal=flags_coal_str,
-            flags_hall=flags_hall_str,
-            flags_courtyard=flags_courtyard_str,   # <-- ny rad
-            items=items_str,
-            inventory=inventory_str,
-            player_action=player_action
-        )
-
+        # Ren förflyttning som motorn avgör själv: inget LLM-anrop
+        shortcut = try_deterministic_move(state, player_action)
+        if shortcut is not None:
+            state, result = shortcut
+            raw = {"deterministic_move": True}
+        else:
+            # Sync flags with items before sending to model (for accurate context)
+            sync_flags_with_items(state)
+            user_prompt = build_user_prompt(state, player_action)
 
-        # LLM call
-        try:
-            raw = client.chat_json(SYSTEM_PROMPT, user_prompt)
-        except Exception as e:
-            dev_log(f"LLM_ERROR: {e}")
-            print("The torch sputters; your thoughts blur. (LLM error). Try again.")
-            continue
+            # LLM call
+            try:
+                raw = client.chat_json(build_system_prompt(state.current_room), user_prompt)
+            except Exception as e:
+                dev_log(f"LLM_ERROR: {e}")
+                print("The torch sputters; your thoughts blur. (LLM error). Try again.")
+                pending.clear()
+                continue
 
-        # Coerce and validate
-        llm = coerce_llm_result(raw)
-        result = validate_and_apply(state, llm, player_action)
+            # Coerce and validate
+            llm = coerce_llm_result(raw)
+            result = validate_and_apply(state, llm, player_action)
 
         # Dev log details
-        dev_log("LLM_PARSED: " + json.dumps(raw, ensure_ascii=False))
-        dev_log("ENGINE_NOTES: " + "; ".join(result["notes"]))
-        dev_log(f"ENGINE_ROOM: {state.current_room}")
-        dev_log(f"ENGINE_FLAGS_CELL: {state.flags_cell}")
-        dev_log(f"ENGINE_FLAGS_COAL: {state.flags_coal}")
-        dev_log(f"ENGINE_FLAGS_HALL: {state.flags_hall}")
-        dev_log(f"ENGINE_FLAGS_COURTYARD: {state.flags_courtyard}")
-
-        dev_log(f"ENGINE_ITEMS: {state.items}")
-        dev_log(f"ENGINE_INV: {state.inventory}")
-        dev_log(f"ENGINE_HP: {state.hp}")
+        if DEV_LOG_ENABLED:
+            dev_log("LLM_PARSED: " + json.dumps(raw, ensure_ascii=False))
+            dev_log("ENGINE_NOTES: " + "; ".join(result["notes"]))
+            dev_log(f"ENGINE_ROOM: {state.current_room}")
+            dev_log(f"ENGINE_FLAGS_CELL: {state.flags_cell}")
+            dev_log(f"ENGINE_FLAGS_COAL: {state.flags_coal}")
+            dev_log(f"ENGINE_FLAGS_HALL: {state.flags_hall}")
+            dev_log(f"ENGINE_FLAGS_COURTYARD: {state.flags_courtyard}")
+
+            dev_log(f"ENGINE_ITEMS: {state.items}")
+            dev_log(f"ENGINE_INV: {state.inventory}")
+            dev_log(f"ENGINE_HP: {state.hp}")
+            flush_dev_log()
 
         # Print narration (model's voice + deterministic cues)
         print("\n" + result["narration"].strip() + "\n")
@@ -2562,14 +3010,15 @@ def main() -> None:
 
         # Death check
         if state.hp <= 0:
-            if not re.search(r"\b(die|dies|dead|death|lifeless|darkness takes you|your last breath)\b",
-                             result["narration"], re.IGNORECASE):
+            if not _DEATH_RE.search(result["narration"]):
                 print("\nYour knees buckle as the world narrows to a single, fading point of light.")
             print(game_over_line())
             return
 
         # Room transition banner + first-time intro + lit entry hint
         if result.get("room_transition"):
+            # Nytt rum = nytt systemprefix; förfyll det medan spelaren läser bannern
+            threading.Thread(target=client.warm_up, args=(build_system_prompt(state.current_room),), daemon=True).start()
             print_room_banner(state.current_room)
             print_room_intro_if_needed(state)
             print_coal_lit_entry_hint_if_applicable(state)
@@ -28,21 +28,22 @@
 
 from __future__ import annotations
 
-import json
 import os
+import threading
 from flask import Flask, request, jsonify, send_from_directory, render_template_string
 
 # Importera motor och resurser från ditt spel
 from escape_castle import (
     GameState,
     OllamaChat,
-    SYSTEM_PROMPT,
-    USER_INSTRUCTION_TEMPLATE,
-    SCENES,
+    build_system_prompt,
+    build_user_prompt,
     sync_flags_with_items,
     coerce_llm_result,
     validate_and_apply,
-    inventory_items_from_items,
+    refresh_inventory,
+    try_deterministic_move,
+    flush_dev_log,
     torch_light_present_here,
     WELCOME_TEXT,
     COAL_INTRO_TEXT,
@@ -721,7 +722,7 @@ def get_state():
     """Första laddningen: returnera välkomsttext + banner + ev. intro för startrummet."""
     global SESSION_STARTED
     sync_flags_with_items(STATE)
-    STATE.inventory = inventory_items_from_items(STATE)
+    refresh_inventory(STATE)
 
     narration = ""
     if not SESSION_STARTED:
@@ -749,46 +750,31 @@ def get_state():
 
 @app.route("/act", methods=["POST"])
 def act():
+    global STATE
     data = request.get_json(force=True)
-    player_action = (data.get("text") or "").strip()
+    player_action = " ".join((data.get("text") or "").split())
     if not player_action:
         return jsonify({"error": "empty"}), 400
 
-    # Bygg prompt (samma som terminal-versionen)
-    scene_card = SCENES[STATE.current_room]
-    scene_json = json.dumps(scene_card, ensure_ascii=False, indent=2)
+    # Ren förflyttning som motorn avgör själv: inget LLM-anrop (samma som terminal-versionen)
+    shortcut = try_deterministic_move(STATE, player_action)
+    if shortcut is not None:
+        STATE, result = shortcut
+    else:
+        # Bygg prompt (samma som terminal-versionen)
+        sync_flags_with_items(STATE)
+        user_prompt = build_user_prompt(STATE, player_action)
 
-    sync_flags_with_items(STATE)
-    flags_cell_str = json.dumps(STATE.flags_cell, ensure_ascii=False)
-    flags_coal_str = json.dumps(STATE.flags_coal, ensure_ascii=False)
-    flags_hall_str = json.dumps(STATE.flags_hall, ensure_ascii=False)
-    flags_courtyard_str = json.dumps(STATE.flags_courtyard, ensure_ascii=False)
-    items_str = json.dumps(STATE.items, ensure_ascii=False)
-    inventory_str = json.dumps(STATE.inventory, ensure_ascii=False)
-
-    user_prompt = USER_INSTRUCTION_TEMPLATE.format(
-        room_id=STATE.current_room,
-        room_title=scene_card.get("title", STATE.current_room),
-        scene_card_json=scene_json,
-        hp=STATE.hp,
-        flags_cell=flags_cell_str,
-        flags_coal=flags_coal_str,
-        flags_hall=flags_hall_str,
-        flags_courtyard=flags_courtyard_str,
-        items=items_str,
-        inventory=inventory_str,
-        player_action=player_action
-    )
-
-    raw = CLIENT.chat_json(SYSTEM_PROMPT, user_prompt)
-    llm = coerce_llm_result(raw)
-    result = validate_and_apply(STATE, llm, player_action)
+        raw = CLIENT.chat_json(build_system_prompt(STATE.current_room), user_prompt)
+        llm = coerce_llm_result(raw)
+        result = validate_and_apply(STATE, llm, player_action)
 
     narration = (result.get("narration") or "").strip()
     if result.get("room_transition"):
         narration = narration.rstrip() + "\n" + append_room_entry_text(STATE)
+        threading.Thread(target=CLIENT.warm_up, args=(build_system_prompt(STATE.current_room),), daemon=True).start()
 
-    STATE.inventory = inventory_items_from_items(STATE)
+    refresh_inventory(STATE)
 
     # Art-val
     art_file = pick_art_filename(STATE, result, narration)
@@ -808,6 +794,12 @@ def act():
         "art": art_file,  # kan vara None → klienten behåller förra bilden
     })
 
+# Dev-loggen är buffrad; skriv ut den efter varje request (atexit körs inte när
+# reloaderns barnprocess dödas)
+@app.teardown_request
+def _flush_dev_log(exc):
+    flush_dev_log()
+
 # Statik (art)
 @app.route("/static/art/<path:filename>")
 def art_file(filename):
@@ -816,4 +808,5 @@ def art_file(filename):
 if __name__ == "__main__":
     # SFX läggs i static/sfx/...
     # Art läggs i static/art/ (endast de filer som listas högst upp)
+    threading.Thread(target=CLIENT.warm_up, args=(build_system_prompt(STATE.current_room),), daemon=True).start()
     app.run(host="127.0.0.1", port=5000, debug=True)